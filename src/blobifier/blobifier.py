@@ -1,6 +1,31 @@
 import numpy as np
 from scipy import ndimage
-from scipy.stats import mode
+
+try:
+    import cc3d
+except ImportError:
+    cc3d = None
+
+# Neighborhoods by connectivity, each including the pixel itself.
+_FOOTPRINTS = {
+    4: np.array([
+        [0, 1, 0],
+        [1, 1, 1],
+        [0, 1, 0]
+    ], dtype=np.uint8),
+    8: np.ones((3, 3), dtype=np.uint8),
+}
+# Offsets that gather the votes of each pixel's neighbors.
+_NEIGHBOR_OFFSETS = {
+    connectivity: np.argwhere(footprint) - 1
+    for connectivity, footprint in _FOOTPRINTS.items()
+}
+# Distance metrics under which a pixel's distance from the filled pixels
+# is the number of fill rounds it takes to reach it.
+_DISTANCE_METRICS = {
+    4: "taxicab",
+    8: "chessboard",
+}
 
 
 class Blobifier:
@@ -8,9 +33,20 @@ class Blobifier:
         self,
         data: np.ndarray,
         min_blob_size: int = 5,
+        connectivity: int = 4,
+        fill_connectivity: int = 8,
     ) -> None:
+        assert connectivity in _FOOTPRINTS, \
+            "Connectivity must be 4 or 8."
+        assert fill_connectivity in _FOOTPRINTS, \
+            "Fill connectivity must be 4 or 8."
+
         self.data = data
         self.min_blob_size = min_blob_size
+        # Which neighbors join pixels into the same blob.
+        self.connectivity = connectivity
+        # Which neighbors vote when filling in small blobs.
+        self.fill_connectivity = fill_connectivity
 
     # Return a mask with True for pixels that are part of small blobs,
     # else False.
@@ -18,55 +54,150 @@ class Blobifier:
         # We have 2^31-1 = 2147483647 values available to use.
         # Make sure the image is reasonably small to not have so many blobs,
         # i.e. width * height < 2^31-1.
+        unique_values, value_idxes = np.unique(
+            self.data,
+            return_inverse=True,
+        )
+        value_idxes = value_idxes.reshape(self.data.shape)
+
+        if cc3d is not None:
+            # cc3d labels all values in a single pass,
+            # but treats 0 as background, so shift the value indices.
+            blob_raster = cc3d.connected_components(
+                value_idxes + 1,
+                connectivity=self.connectivity,
+            ).astype(np.int32, copy=False)
+            blob_raster[self.data != self.data] = 0  # NaN is never a blob
+            return blob_raster
+
+        # Label each value only within its bounding box
+        # instead of scanning the whole raster once per value.
         blob_raster = np.zeros_like(self.data, dtype=np.int32)
-        unique_values = np.unique(self.data)
+        value_bboxes = ndimage.find_objects(value_idxes + 1)
         total_num_features = 0
-        for uv in unique_values:
-            binary_raster = np.zeros_like(self.data)
-            binary_raster[self.data == uv] = 1
-            binary_blob_raster, num_features = ndimage.label(binary_raster)
-            mask = binary_raster > 0
-            blob_raster[mask] = binary_blob_raster[mask] + total_num_features
+        for i, bbox in enumerate(value_bboxes):
+            uv = unique_values[i]
+            if bbox is None or uv != uv:  # skip NaN like `==` would
+                continue
+            mask = value_idxes[bbox] == i
+            binary_blob_raster, num_features = ndimage.label(
+                mask,
+                structure=_FOOTPRINTS[self.connectivity],
+            )
+            blob_bbox = blob_raster[bbox]
+            blob_bbox[mask] = binary_blob_raster[mask] + total_num_features
             total_num_features += num_features
         return blob_raster
 
     def _mask_small_blobs(self, blob_raster: np.ndarray) -> np.ndarray:
-        small_blob_mask = np.zeros_like(blob_raster, dtype=bool)
         all_pixel_values = blob_raster.ravel()
         component_sizes = np.bincount(all_pixel_values)
-        small_components = np.where(component_sizes < self.min_blob_size)[0]
-        for component_label in small_components:
-            small_blob_mask[blob_raster == component_label] = True
+        # Look up whether each pixel's blob is small in a single pass.
+        is_small_component = component_sizes < self.min_blob_size
+        small_blob_mask = is_small_component[blob_raster]
         return small_blob_mask
 
+    # Repeatedly fill every unfilled pixel that has a filled neighbor
+    # with the most common value among its neighbors,
+    # preferring the smallest value on ties.
     def _fill_blobs(self, mask: np.ndarray) -> np.ndarray:
-        neighborhood = np.array([
-            [1, 1, 1],
-            [1, 1, 1],
-            [1, 1, 1]
-        ], dtype=np.uint8)
-
-        def choose_value(x):
-            center = x[4]
-            selection = x[x != -1]
-            if center == -1 and not selection.size == 0:
-                m = mode(selection, axis=None).mode
-                return m
-            else:
-                return center
-
         blob_raster = self.data.copy()
         blob_raster[mask] = -1
-        while np.any(blob_raster == -1):
-            result = ndimage.generic_filter(
-                blob_raster,
-                choose_value,
-                footprint=neighborhood,
-                mode="constant",
-                cval=0
+        # Pixels beyond the edge vote as 0.
+        blob_raster = np.pad(
+            blob_raster,
+            1,
+            mode="constant",
+            constant_values=0,
+        )
+        unfilled = blob_raster == -1
+        if not np.any(unfilled):
+            return blob_raster[1:-1, 1:-1]
+
+        # Pixels more than one away from any unfilled pixel
+        # neither change nor vote, so only work within the
+        # bounding box of the unfilled pixels plus a margin of one.
+        # The margin always fits as the padding is never unfilled.
+        rows = np.flatnonzero(np.any(unfilled, axis=1))
+        cols = np.flatnonzero(np.any(unfilled, axis=0))
+        window = (
+            slice(rows[0] - 1, rows[-1] + 2),
+            slice(cols[0] - 1, cols[-1] + 2),
+        )
+        window_raster = blob_raster[window]
+        unfilled = unfilled[window]
+
+        # Each round fills the pixels one step further from the
+        # originally filled ones, so the round in which a pixel is filled
+        # is its distance to the nearest filled pixel.
+        levels = ndimage.distance_transform_cdt(
+            unfilled,
+            metric=_DISTANCE_METRICS[self.fill_connectivity],
+        )
+        neighbor_offsets = _NEIGHBOR_OFFSETS[self.fill_connectivity]
+
+        # Group the unfilled pixels by round up front,
+        # rather than scanning the whole window for each round.
+        unfilled_idxes = np.flatnonzero(levels)
+        unfilled_levels = levels.ravel()[unfilled_idxes]
+        order = np.argsort(unfilled_levels, kind="stable")
+        unfilled_idxes = unfilled_idxes[order]
+        num_levels = unfilled_levels[order[-1]]
+        level_bounds = np.searchsorted(
+            unfilled_levels[order],
+            np.arange(1, num_levels + 2),
+        )
+
+        for level in range(1, num_levels + 1):
+            frontier_idxes = unfilled_idxes[
+                level_bounds[level-1]:level_bounds[level]
+            ]
+            frontier_rows, frontier_cols = np.divmod(
+                frontier_idxes,
+                levels.shape[1],
             )
-            blob_raster = result
-        return blob_raster
+            neighbor_rows = frontier_rows[:, None] + neighbor_offsets[:, 0]
+            neighbor_cols = frontier_cols[:, None] + neighbor_offsets[:, 1]
+            votes = window_raster[neighbor_rows, neighbor_cols]
+            # Neighbors filled in this round or later do not vote.
+            # NaN votes count together as one candidate,
+            # which np.unique sorts last, as scipy.stats.mode does.
+            is_vote = levels[neighbor_rows, neighbor_cols] < level
+            vote_frontier_idxes = np.nonzero(is_vote)[0]
+            candidates, vote_candidate_idxes = np.unique(
+                votes[is_vote],
+                return_inverse=True,
+            )
+
+            # Count the votes for each (frontier pixel, candidate) pair.
+            num_candidates = len(candidates)
+            pairs, pair_counts = np.unique(
+                vote_frontier_idxes * num_candidates + vote_candidate_idxes,
+                return_counts=True,
+            )
+            pair_frontier_idxes = pairs // num_candidates
+            pair_candidate_idxes = pairs % num_candidates
+
+            # Pairs are sorted by candidate within each frontier pixel,
+            # so a stable sort by descending count
+            # keeps the smallest value first on ties.
+            order = np.lexsort((-pair_counts, pair_frontier_idxes))
+            sorted_frontier_idxes = pair_frontier_idxes[order]
+            is_first = np.ones(len(order), dtype=bool)
+            is_first[1:] = \
+                sorted_frontier_idxes[1:] != sorted_frontier_idxes[:-1]
+            winners = order[is_first]
+
+            best_value = np.zeros(
+                len(frontier_rows),
+                dtype=window_raster.dtype,
+            )
+            best_value[pair_frontier_idxes[winners]] = \
+                candidates[pair_candidate_idxes[winners]]
+
+            window_raster[frontier_rows, frontier_cols] = best_value
+
+        return blob_raster[1:-1, 1:-1]
 
     def blobify(self):
         blob_raster = self._identify_blobs()
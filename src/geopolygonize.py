@@ -18,7 +18,7 @@ from .utils.clean_exit import kill_self
 @click.option(
     '--output-file',
     type=click.Path(file_okay=True, dir_okay=False),
-    help="Output gpkg file path",
+    help="Output gpkg file path, or .parquet for GeoParquet",
     required=True,
 )
 @click.option(
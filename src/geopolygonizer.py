@@ -1,6 +1,8 @@
 from dataclasses import dataclass
+from functools import lru_cache, partial
 import glob
 import multiprocessing
+from multiprocessing.util import Finalize
 import os
 import re
 import tempfile
@@ -10,25 +12,71 @@ from typing import Any, Callable, Dict, List, Tuple
 from affine import Affine
 import geopandas as gpd
 import numpy as np
-import pandas as pd
+from pyogrio.raw import read as read_raw
 import rasterio
 from rasterio import DatasetReader
 from rasterio.crs import CRS
 from rasterio.features import shapes
 from rasterio.windows import Window
-from shapely.affinity import translate
-from shapely.geometry import shape, LineString, Point, Polygon
+import shapely
+from shapely.geometry import Point
 import warnings
 
 from .blobifier.blobifier import Blobifier
 from .segmenter.segmenter import Segmenter
-from .utils.smoothing import chaikins_corner_cutting
+from .utils.shapes import polygons_from_shapes
+from .utils.smoothing import chaikins_corner_cutting_in_bulk
 from .utils.tiler import Tiler, TileParameters, TilerParameters
 from .utils.unifier import unify_by_label
 
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
 _EPSILON = 1.0e-10
+_TILE_IO_ENGINE = "pyogrio"
+# Intermediate vector tiles are written as FlatGeobuf,
+# which is much cheaper to encode and parse than GeoPackage.
+# Its spatial index is disabled since it would reorder the features.
+_TILE_VECTOR_EXTENSION = "fgb"
+_TILE_VECTOR_OPTIONS = {"SPATIAL_INDEX": "NO"}
+# The output is written in bulk through pyogrio
+# rather than feature by feature through fiona.
+_OUTPUT_IO_ENGINE = "pyogrio"
+# Outputs named with this extension are written as GeoParquet instead.
+_PARQUET_EXTENSION = ".parquet"
+_PARQUET_COMPRESSION = "zstd"
+
+
+# Tiles are revisited when neighboring regions are stitched together,
+# so the same paths are requested many times.
+# This is a module-level function rather than a cached method
+# so that `GeoPolygonizer` stays picklable for the tile workers.
+@lru_cache(maxsize=65536)
+def _get_tile_path(
+    work_dir: str,
+    step: str,
+    tile_parameters: TileParameters,
+    file_extension: str,
+) -> str:
+    return os.path.join(
+        work_dir,
+        f"{step}-tile"
+        f"_{tile_parameters.start_x}-{tile_parameters.start_y}"
+        f"_{tile_parameters.width}-{tile_parameters.height}"
+        f".{file_extension}",
+    )
+
+
+# Every tile read from the input opens it again otherwise,
+# so each input worker opens it once when it starts
+# and keeps it open for all the tiles it reads.
+_input_dataset: DatasetReader | None = None
+
+
+def _open_input(input_file: str) -> None:
+    global _input_dataset
+    _input_dataset = rasterio.open(input_file)
+    # Pool workers run their finalizers as they exit.
+    Finalize(None, _input_dataset.close, exitpriority=0)
 
 
 @dataclass
@@ -38,7 +86,7 @@ class GeoPolygonizerParams:
     input_file: str
     """Input TIF file path"""
     output_file: str
-    """Output gpkg file path"""
+    """Output gpkg file path, or .parquet for GeoParquet"""
     label_name: str = 'label'
     """The name of the attribute each pixel value represents."""
     min_blob_size: int = 5
@@ -130,6 +178,12 @@ class GeoPolygonizer:
         )
         self._workers = multiprocessing.cpu_count() \
             if params.workers == 0 else params.workers
+        # The CPUs left over by the tile processes are shared out
+        # as threads within each tile's segmenter.
+        self._threads_per_tile = max(
+            1,
+            multiprocessing.cpu_count() // self._workers,
+        )
 
         with rasterio.open(params.input_file) as src:
             self._meta: Dict[str, Any] = src.meta
@@ -216,22 +270,28 @@ class GeoPolygonizer:
                 f"{step}.{file_extension}"
             )
         else:
-            tile_path = os.path.join(
+            tile_path = _get_tile_path(
                 self._work_dir,
-                f"{step}-tile"
-                f"_{tile_parameters.start_x}-{tile_parameters.start_y}"
-                f"_{tile_parameters.width}-{tile_parameters.height}"
-                f".{file_extension}",
+                step,
+                tile_parameters,
+                file_extension,
             )
         return tile_path
 
-    def _get_tile_glob(self, step: str, file_extension: str) -> str:
-        glob_pattern = os.path.join(
-            self._work_dir,
-            f"{step}-tile_*_*"
-            f".{file_extension}",
-        )
-        return glob_pattern
+    def _get_tile_paths(
+        self,
+        step: str,
+        file_extension: str,
+    ) -> List[str]:
+        prefix = f"{step}-tile_"
+        suffix = f".{file_extension}"
+        # Collected into a list so that the progress bar knows its length.
+        with os.scandir(self._work_dir) as entries:
+            return [
+                entry.path for entry in entries
+                if entry.name.startswith(prefix)
+                and entry.name.endswith(suffix)
+            ]
 
     def _get_tile_params_from_file(
         self,
@@ -269,18 +329,14 @@ class GeoPolygonizer:
         region_end_x = region_parameters.start_x + region_parameters.width
         region_end_y = region_parameters.start_y + region_parameters.height
 
-        for start_x in range(0, self._width, self._tile_size):
-            if start_x + self._tile_size < region_start_x:
-                continue
-            if start_x >= region_end_x:
-                break
-
-            for start_y in range(0, self._height, self._tile_size):
-                if start_y + self._tile_size < region_start_y:
-                    continue
-                if start_y >= region_end_y:
-                    break
+        # Only visit the tiles that overlap the region.
+        first_x = region_start_x // self._tile_size * self._tile_size
+        first_y = region_start_y // self._tile_size * self._tile_size
+        last_x = min(region_end_x, self._width)
+        last_y = min(region_end_y, self._height)
 
+        for start_x in range(first_x, last_x, self._tile_size):
+            for start_y in range(first_y, last_y, self._tile_size):
                 tile_parameters = TileParameters(
                     start_x=start_x,
                     start_y=start_y,
@@ -288,44 +344,25 @@ class GeoPolygonizer:
                     height=self._tile_size,
                 )
                 tile_path = self._get_path(step, tile_parameters, "npy")
-                tile = np.load(tile_path)
-                tile_width = tile.shape[0]
-                tile_height = tile.shape[1]
-                end_x = start_x + tile_width
-                end_y = start_y + tile_height
-
-                if start_x < region_start_x:
-                    rel_tile_start_x = region_start_x - start_x
-                    rel_data_start_x = 0
-                else:
-                    rel_tile_start_x = 0
-                    rel_data_start_x = start_x - region_start_x
-                if end_x < region_end_x:
-                    rel_tile_end_x = end_x - start_x
-                    rel_data_end_x = end_x - region_start_x
-                else:
-                    rel_tile_end_x = region_end_x - start_x
-                    rel_data_end_x = region_end_x - region_start_x
-                    pass
-                if start_y < region_start_y:
-                    rel_tile_start_y = region_start_y - start_y
-                    rel_data_start_y = 0
-                else:
-                    rel_tile_start_y = 0
-                    rel_data_start_y = start_y - region_start_y
-                if end_y < region_end_y:
-                    rel_tile_end_y = end_y - start_y
-                    rel_data_end_y = end_y - region_start_y
-                else:
-                    rel_tile_end_y = region_end_y - start_y
-                    rel_data_end_y = region_end_y - region_start_y
+                # Memory-map the tile so only the overlap is read in.
+                tile = np.load(tile_path, mmap_mode='r')
+
+                overlap_start_x = max(start_x, region_start_x)
+                overlap_start_y = max(start_y, region_start_y)
+                overlap_end_x = min(start_x + tile.shape[0], region_end_x)
+                overlap_end_y = min(start_y + tile.shape[1], region_end_y)
+                if overlap_end_x <= overlap_start_x \
+                        or overlap_end_y <= overlap_start_y:
+                    continue
 
                 data[
-                    rel_data_start_x:rel_data_end_x,
-                    rel_data_start_y:rel_data_end_y
+                    overlap_start_x-region_start_x:
+                    overlap_end_x-region_start_x,
+                    overlap_start_y-region_start_y:
+                    overlap_end_y-region_start_y,
                 ] = tile[
-                    rel_tile_start_x:rel_tile_end_x,
-                    rel_tile_start_y:rel_tile_end_y,
+                    overlap_start_x-start_x:overlap_end_x-start_x,
+                    overlap_start_y-start_y:overlap_end_y-start_y,
                 ]
 
         return data
@@ -348,11 +385,34 @@ class GeoPolygonizer:
                 self._height
             )
 
-            with rasterio.open(self._input_file) as src:
+            src = _input_dataset
+            assert src is not None
+            # The window is read straight into a memory-mapped file
+            # rather than into memory first and then saved.
+            # It is only moved into place once complete,
+            # so a failed read never leaves a tile that looks done.
+            partial_path = f"{tile_path}.partial"
+            try:
+                tile = np.lib.format.open_memmap(
+                    partial_path,
+                    mode='w+',
+                    dtype=src.dtypes[0],
+                    shape=(bx1-bx0, by1-by0),
+                )
                 # Window treats x as cols and y as rows,
                 # whereas we treat x as rows and y as cols.
-                tile = src.read(1, window=Window(by0, bx0, by1-by0, bx1-bx0))
-                np.save(tile_path, tile)
+                src.read(
+                    1,
+                    window=Window(by0, bx0, by1-by0, bx1-bx0),
+                    out=tile,
+                )
+                tile.flush()
+                del tile
+                os.replace(partial_path, tile_path)
+            except Exception:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                raise
         except Exception as e:
             self._handle_exception(e, step, tile_parameters)
 
@@ -402,7 +462,7 @@ class GeoPolygonizer:
                 region_parameters.start_y + region_parameters.height
             )
             tile = cleaned[rel_start_x:rel_end_x, rel_start_y:rel_end_y]
-            np.save(tile_path, tile)
+            np.save(tile_path, tile, allow_pickle=False)
         except Exception as e:
             self._handle_exception(e, step, tile_parameters)
 
@@ -413,7 +473,11 @@ class GeoPolygonizer:
         step = "polygonize"
         prev_step = "clean"
         try:
-            tile_path = self._get_path(step, tile_parameters, "gpkg")
+            tile_path = self._get_path(
+                step,
+                tile_parameters,
+                _TILE_VECTOR_EXTENSION,
+            )
             if os.path.exists(tile_path):
                 return
 
@@ -423,57 +487,111 @@ class GeoPolygonizer:
             tile = np.load(prev_tile_path)
             tile = tile.astype('float32')
 
-            shapes_gen = shapes(tile, transform=self._transform)
-            polygons_and_labels = list(zip(*shapes_gen))
-            polygons: List[Polygon] = [
-                shape(s) for s in polygons_and_labels[0]
-            ]
-            labels: List[Any] = [v for v in polygons_and_labels[1]]
-
-            gdf = gpd.GeoDataFrame(geometry=polygons)
-            gdf[self._label_name] = labels
             # in physical space, x and y are reversed
             shift_x = tile_parameters.start_y * self._pixel_size
             shift_y = -(tile_parameters.start_x * self._pixel_size)
-            gdf['geometry'] = gdf['geometry'].apply(
-                lambda geom: translate(geom, xoff=shift_x, yoff=shift_y)
+            tile_transform = \
+                Affine.translation(shift_x, shift_y) * self._transform
+
+            shapes_gen = shapes(tile, transform=tile_transform)
+            polygons_and_labels = list(zip(*shapes_gen))
+            polygons = polygons_from_shapes(polygons_and_labels[0])
+            labels: List[Any] = [v for v in polygons_and_labels[1]]
+
+            gdf = gpd.GeoDataFrame(
+                {self._label_name: labels},
+                geometry=polygons,
+                crs=self._crs,
+            )
+            gdf.to_file(
+                tile_path,
+                engine=_TILE_IO_ENGINE,
+                layer_options=_TILE_VECTOR_OPTIONS,
             )
-            gdf.crs = self._crs
-            gdf.to_file(tile_path)
         except Exception as e:
             self._handle_exception(e, step, tile_parameters)
 
-    def _generate_smoothing_func(self) -> Callable[[LineString], LineString]:
-        def smooth(segment: LineString) -> LineString:
-            coords = chaikins_corner_cutting(
-                segment.coords,
-                self._smoothing_iterations
+    def _generate_smoothing_func(self) -> Callable[
+        [np.ndarray, np.ndarray],
+        Tuple[np.ndarray, np.ndarray],
+    ]:
+        def smooth(
+            coords: np.ndarray,
+            offsets: np.ndarray,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+            return chaikins_corner_cutting_in_bulk(
+                coords,
+                offsets,
+                self._smoothing_iterations,
             )
-            return LineString(coords)
 
+        # Smooths all the segments at once.
+        smooth.batched = True
         return smooth
 
-    def _generate_simplify_func(self) -> Callable[[LineString], LineString]:
+    def _generate_simplify_func(self) -> Callable[
+        [np.ndarray, np.ndarray],
+        Tuple[np.ndarray, np.ndarray],
+    ]:
         tolerance = self._pixel_size * self._simplification_pixel_window
 
-        def simplify(segment: LineString) -> LineString:
+        def simplify(
+            coords: np.ndarray,
+            offsets: np.ndarray,
+        ) -> Tuple[np.ndarray, np.ndarray]:
+            num_segments = len(offsets) - 1
+            sizes = np.diff(offsets)
+            segments = shapely.linestrings(
+                coords,
+                indices=np.repeat(np.arange(num_segments), sizes),
+            )
+
             # Simplification will turn rings into what are effectively points.
             # We cut the ring in half to provide simplification
             # with non-ring segments instead.
-            if segment.is_ring:
-                assert len(segment.coords) >= 3
-                midpoint_idx = len(segment.coords) // 2
-                segment1 = LineString(segment.coords[:midpoint_idx+1])
-                segment2 = LineString(segment.coords[midpoint_idx:])
-                simplified1 = segment1.simplify(tolerance)
-                simplified2 = segment2.simplify(tolerance)
-                coords =\
-                    list(simplified1.coords)[:-1] + list(simplified2.coords)
-                simplified = LineString(coords)
-            else:
-                simplified = segment.simplify(tolerance)
-            return simplified
+            ring_idxes = np.flatnonzero(shapely.is_ring(segments))
+            assert np.all(sizes[ring_idxes] >= 3)
+            midpoint_idxes = offsets[ring_idxes] + sizes[ring_idxes] // 2
+            first_halves = [
+                shapely.linestrings(coords[offsets[i]:m+1])
+                for i, m in zip(ring_idxes, midpoint_idxes)
+            ]
+            second_halves = [
+                shapely.linestrings(coords[m:offsets[i+1]])
+                for i, m in zip(ring_idxes, midpoint_idxes)
+            ]
+            parts = segments.copy()
+            parts[ring_idxes] = np.array(first_halves, dtype=object)
+            parts = np.concatenate([
+                parts,
+                np.array(second_halves, dtype=object),
+            ])
+            part_segment_idxes = \
+                np.concatenate([np.arange(num_segments), ring_idxes])
+
+            simplified_coords, part_idxes = shapely.get_coordinates(
+                shapely.simplify(parts, tolerance),
+                return_index=True,
+            )
+
+            # The first half of a ring ends where the second half starts,
+            # so that end is dropped before the halves are joined.
+            part_ends = np.cumsum(
+                np.bincount(part_idxes, minlength=len(parts))
+            ) - 1
+            is_kept = np.ones(len(simplified_coords), dtype=bool)
+            is_kept[part_ends[ring_idxes]] = False
+            segment_idxes = part_segment_idxes[part_idxes[is_kept]]
+            order = np.argsort(segment_idxes, kind="stable")
+
+            simplified_offsets = np.zeros(num_segments + 1, dtype=np.intp)
+            simplified_offsets[1:] = np.cumsum(
+                np.bincount(segment_idxes, minlength=num_segments)
+            )
+            return simplified_coords[is_kept][order], simplified_offsets
 
+        # Simplifies all the segments at once.
+        simplify.batched = True
         return simplify
 
     def _vectorize_tile(
@@ -483,14 +601,22 @@ class GeoPolygonizer:
         step = "vectorize"
         prev_step = "polygonize"
         try:
-            tile_path = self._get_path(step, tile_parameters, "gpkg")
+            tile_path = self._get_path(
+                step,
+                tile_parameters,
+                _TILE_VECTOR_EXTENSION,
+            )
             if os.path.exists(tile_path):
                 return
 
-            prev_tile_path = self._get_path(prev_step, tile_parameters, "gpkg")
+            prev_tile_path = self._get_path(
+                prev_step,
+                tile_parameters,
+                _TILE_VECTOR_EXTENSION,
+            )
             if not os.path.exists(prev_tile_path):
                 return
-            gdf = gpd.read_file(prev_tile_path)
+            gdf = gpd.read_file(prev_tile_path, engine=_TILE_IO_ENGINE)
             polygons = gdf.geometry.to_list()
             labels = gdf[self._label_name].to_list()
 
@@ -498,15 +624,22 @@ class GeoPolygonizer:
                 polygons=polygons,
                 labels=labels,
                 pin_border=True,
+                workers=self._threads_per_tile,
             )
             segmenter.run_per_segment(self._generate_simplify_func())
             segmenter.run_per_segment(self._generate_smoothing_func())
             modified_polygons, modified_labels = segmenter.get_result()
 
-            gdf = gpd.GeoDataFrame(geometry=modified_polygons)
-            gdf[self._label_name] = modified_labels
-            gdf.crs = self._crs
-            gdf.to_file(tile_path)
+            gdf = gpd.GeoDataFrame(
+                {self._label_name: modified_labels},
+                geometry=modified_polygons,
+                crs=self._crs,
+            )
+            gdf.to_file(
+                tile_path,
+                engine=_TILE_IO_ENGINE,
+                layer_options=_TILE_VECTOR_OPTIONS,
+            )
         except Exception as e:
             self._handle_exception(e, step, tile_parameters)
 
@@ -514,17 +647,45 @@ class GeoPolygonizer:
         step = "stitch"
         prev_step = "vectorize"
         try:
-            all_gdfs = []
+            # Read the raw geometries and labels of every tile
+            # and build a single GeoDataFrame from them,
+            # rather than concatenating one GeoDataFrame per tile.
+            all_geometries = []
+            all_labels = []
             for filepath in tqdm(
-                glob.glob(self._get_tile_glob(prev_step, "gpkg")),
-                desc="Stitching gpkg files",
+                self._get_tile_paths(prev_step, _TILE_VECTOR_EXTENSION),
+                desc="Stitching tiles",
+                mininterval=0.5,
             ):
-                gdf = gpd.read_file(filepath)
-                all_gdfs.append(gdf)
+                _meta, _fids, geometries, field_data = read_raw(
+                    filepath,
+                    columns=[self._label_name],
+                )
+                all_geometries.append(geometries)
+                all_labels.append(field_data[0])
 
-            output_gdf = pd.concat(all_gdfs)
-            output_gdf = unify_by_label(output_gdf, self._label_name)
-            output_gdf.to_file(self._output_file)
+            output_gdf = gpd.GeoDataFrame(
+                {self._label_name: np.concatenate(all_labels)},
+                geometry=shapely.from_wkb(np.concatenate(all_geometries)),
+                crs=self._crs,
+            )
+            output_gdf = unify_by_label(
+                output_gdf,
+                self._label_name,
+                self._workers,
+            )
+            if self._output_file.endswith(_PARQUET_EXTENSION):
+                # GeoParquet is written column by column and compressed,
+                # through pyarrow from the `parquet` extra.
+                output_gdf.to_parquet(
+                    self._output_file,
+                    compression=_PARQUET_COMPRESSION,
+                )
+            else:
+                output_gdf.to_file(
+                    self._output_file,
+                    engine=_OUTPUT_IO_ENGINE,
+                )
         except Exception as e:
             self._handle_exception(e, step, None)
 
@@ -546,6 +707,7 @@ class GeoPolygonizer:
             tiler_parameters=tiler_parameters,
             step="input",
             process_tile=self._input_tile,
+            init_worker=partial(_open_input, self._input_file),
         )
         input_tiler.process()
 
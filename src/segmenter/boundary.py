@@ -1,16 +1,45 @@
 from sortedcontainers import SortedDict
 from typing import Dict, ItemsView, List, Tuple, TypeAlias
 
+import numpy as np
+import shapely
 from shapely.geometry import LineString, Point
-from rtree import index
 
 from .orientation import Orientation
 from .segment import Segment
 
 NeighborIdx: TypeAlias = int
+# Points are keyed by their coordinates,
+# which hash and compare much faster than shapely geometries.
+Coord: TypeAlias = Tuple[float, float]
 
 
 class Boundary(object):
+    __slots__ = (
+        'idx',
+        'line',
+        'coords',
+        'coord_tuples',
+        '_vertices',
+        '_start_point',
+        'cumulative_distances',
+        '_sort_cache',
+        '_seg_idx',
+        '_positioned_coords',
+        '_closed_intersections',
+        '_intersections',
+        '_border_intersections',
+        '_cutpoints',
+        '_ordered_cutpoints',
+        '_potential_references',
+        '_segment_map',
+        '_oriented_segment_map',
+        '_get_segment_idx_and_orientation',
+        'segments',
+        'modified_coords',
+        '_modified_line',
+    )
+
     def __enter__(self) -> 'Boundary':
         return self
 
@@ -23,53 +52,87 @@ class Boundary(object):
 
         self.idx = idx
         self.line = LineString(boundary.coords)
+        # Coordinates are read out of the line once
+        # rather than on every access.
+        self.coords = shapely.get_coordinates(self.line)
+        self.coord_tuples: List[Coord] = list(self.line.coords)
+        # Lets `on_boundary` answer for vertices with a hash probe,
+        # and prepares the line for any other point it is asked about.
+        self._vertices = set(self.coord_tuples)
+        shapely.prepare(self.line)
+        self._start_point: Point | None = None
         self._setup_sort_cache()
         self._setup_temporary_variables()
 
-        self._segment_map: Dict[Tuple[int, int], int] | None = None
+        self._segment_map: Dict[Tuple[Coord, Coord], int] | None = None
+        self._oriented_segment_map: \
+            Dict[Tuple[Coord, Coord], Tuple[int, Orientation]] | None = None
         self.segments: List[Segment] = []
+        self._get_segment_idx_and_orientation = \
+            self._get_unset_segment_idx_and_orientation
 
-        self.modified_line: LineString | None = None
+        # The modified line is only made from its coordinates if asked for.
+        self.modified_coords: np.ndarray | None = None
+        self._modified_line: LineString | None = None
 
     def _setup_sort_cache(self) -> None:
-        self._sort_cache: Dict[Point, float] = {}
-
-        start = Point(self.line.coords[0])
-        self.cumulative_distances = {start: 0}
-        for i in range(1, len(self.line.coords) - 1):
-            seg_start = Point(self.line.coords[i-1])
-            seg_end = Point(self.line.coords[i])
-            segment = LineString([seg_start, seg_end])
-            self.cumulative_distances[seg_end] = \
-                self.cumulative_distances[seg_start] + segment.length
-        # end is same as beginning
-
-        self._seg_idx = index.Index()
-        for i in range(len(self.line.coords) - 1):
-            segment = LineString(
-                [self.line.coords[i], self.line.coords[i + 1]]
-            )
-            bbox = segment.bounds
-            self._seg_idx.insert(i, bbox)
+        # end is same as beginning, so it is left out
+        coords = self.coords[:-1]
+        deltas = np.diff(coords, axis=0)
+        lengths = np.sqrt(deltas[:, 0] * deltas[:, 0]
+                          + deltas[:, 1] * deltas[:, 1])
+        distances = np.concatenate([[0.0], np.cumsum(lengths)])
+        # A repeated vertex keeps the distance of its last occurrence.
+        self.cumulative_distances: Dict[Coord, float] = dict(zip(
+            self.coord_tuples[:-1],
+            distances.tolist(),
+        ))
+        # Vertices are keyed by their distance along the boundary,
+        # so the cache starts out with them
+        # and points are looked up in just the one place.
+        self._sort_cache: Dict[Coord, float] = \
+            dict(self.cumulative_distances)
+
+        # Most boundaries are never asked for a point between vertices,
+        # so the segment index is only built on first use.
+        self._seg_idx: shapely.STRtree | None = None
+        self._positioned_coords: Tuple[np.ndarray, np.ndarray] | None = None
 
     def _setup_temporary_variables(self) -> None:
         self._closed_intersections: Dict[NeighborIdx, LineString] = {}
         self._intersections: Dict[NeighborIdx, List[LineString]] = {}
 
-        # Cutpoints are points that define the endpoints of the segments.
+        # Cutpoints are points that define the endpoints of the segments,
+        # kept as their coordinates.
         # If boundaries A and B share an intersection,
         # they are expected to have all the same cutpoints between them.
         self._cutpoints = SortedDict()
-
-        # Index i is potential references for self.segments[i].
-        self._potential_references: List[List[Segment]] = []
-
-    def on_boundary(self, point: Point) -> bool:
-        start = Point(self.line.coords[0])
-        end = Point(self.line.coords[-1])
-        return point.intersects(self.line) \
-            or point.equals(start) \
-            or point.equals(end)
+        # The cutpoints in order along with where each one is in it,
+        # made once the cutpoints are all in.
+        self._ordered_cutpoints: \
+            Tuple[List[Coord], Dict[Coord, int]] | None = None
+
+        # Index i is potential references for self.segments[i],
+        # each along with its orientation relative to that segment.
+        self._potential_references: \
+            List[List[Tuple[Segment, Orientation]]] = []
+
+    def get_start_point(self) -> Point:
+        # The start is checked against every neighboring boundary,
+        # so its point is made once and shared.
+        if self._start_point is None:
+            self._start_point = Point(self.coord_tuples[0])
+        return self._start_point
+
+    def on_boundary(self, coord: Coord, point: Point | None = None) -> bool:
+        # The start and end are vertices too,
+        # so only points between vertices need the geometric test.
+        if coord in self._vertices:
+            return True
+        if point is None:
+            point = Point(coord)
+        # Only the first geometry of a predicate benefits from preparing.
+        return self.line.intersects(point)
 
     def set_border_intersections(
         self,
@@ -80,31 +143,150 @@ class Boundary(object):
     def get_border_intersections(self) -> List[LineString]:
         return self._border_intersections
 
-    def get_point_sort_key(self, point: Point) -> float:
-        if point in self._sort_cache:
-            return self._sort_cache[point]
+    def _get_seg_idx(self) -> shapely.STRtree:
+        if self._seg_idx is None:
+            # The whole index is packed in one go from all the segments.
+            segments = shapely.linestrings(
+                np.stack([self.coords[:-1], self.coords[1:]], axis=1)
+            )
+            self._seg_idx = shapely.STRtree(segments)
+        return self._seg_idx
+
+    def _check_segment_candidates(self, num_candidates: int) -> None:
+        if num_candidates == 0:
+            raise Exception('Point is not in line as expected.')
+        if num_candidates > 1:
+            raise Exception(
+                'Point is not between just two '
+                'line coordinates as expected.'
+            )
 
-        if point in self.cumulative_distances:
-            distance = self.cumulative_distances[point]
-        else:
-            s_idxes = list(self._seg_idx.intersection(point.bounds))
-            if len(s_idxes) == 0:
-                raise Exception('Point is not in line as expected.')
-            if len(s_idxes) > 1:
-                raise Exception(
-                    'Point is not between just two '
-                    'line coordinates as expected.'
-                )
-            s_idx = s_idxes[0]
-            seg_start = Point(self.line.coords[s_idx])
-            seg_end = Point(self.line.coords[s_idx + 1])
-            segment = LineString([seg_start, seg_end])
-            distance = \
-                self.cumulative_distances[seg_start] + segment.project(point)
-
-        self._sort_cache[point] = distance
+    def _get_segment_idx(self, coord: Coord) -> int:
+        # Any segment whose bounding box the point falls in is a candidate.
+        s_idxes = self._get_seg_idx().query(Point(coord))
+        self._check_segment_candidates(len(s_idxes))
+        return int(s_idxes[0])
+
+    def _get_segment_idxes(self, points: np.ndarray) -> np.ndarray:
+        """
+        Same as `_get_segment_idx` for each point,
+        but with all the points queried at once.
+        """
+
+        point_idxes, s_idxes = self._get_seg_idx().query(points)
+        num_candidates = np.bincount(point_idxes, minlength=len(points))
+        for n in num_candidates.tolist():
+            self._check_segment_candidates(n)
+        point_s_idxes = np.empty(len(points), dtype=np.intp)
+        point_s_idxes[point_idxes] = s_idxes
+        return point_s_idxes
+
+    def _project(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        coords: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Distance along each segment from `starts[i]` to `ends[i]`
+        of the point on it closest to `coords[i]`,
+        computed the same way as `LineString.project`.
+        """
+
+        dx = ends[:, 0] - starts[:, 0]
+        dy = ends[:, 1] - starts[:, 1]
+        length_squared = dx * dx + dy * dy
+        factors = (
+            (coords[:, 0] - starts[:, 0]) * dx
+            + (coords[:, 1] - starts[:, 1]) * dy
+        ) / length_squared
+        lengths = np.sqrt(length_squared)
+        return np.where(
+            factors <= 0.0,
+            0.0,
+            np.where(factors <= 1.0, factors * lengths, lengths),
+        )
+
+    def get_coord_sort_key(self, coord: Coord) -> float:
+        if coord in self._sort_cache:
+            return self._sort_cache[coord]
+
+        s_idx = self._get_segment_idx(coord)
+        seg_start = self.coord_tuples[s_idx]
+        projection = self._project(
+            self.coords[s_idx:s_idx + 1],
+            self.coords[s_idx + 1:s_idx + 2],
+            np.array([coord]),
+        )
+        distance = self.cumulative_distances[seg_start] \
+            + float(projection[0])
+
+        self._sort_cache[coord] = distance
         return distance
 
+    def get_coord_sort_keys(self, coords: np.ndarray) -> List[float]:
+        """
+        Same as `get_coord_sort_key` for each row of `coords`,
+        but projects all the points that fall between vertices
+        onto their segments at once.
+        """
+
+        keys: List[float] = [0.0] * len(coords)
+        between_idxes: List[int] = []
+        for i, coord in enumerate(map(tuple, coords.tolist())):
+            if coord in self._sort_cache:
+                keys[i] = self._sort_cache[coord]
+            else:
+                between_idxes.append(i)
+
+        if len(between_idxes) == 0:
+            return keys
+
+        between_coords = coords[between_idxes]
+        s_idxes = self._get_segment_idxes(shapely.points(between_coords))
+        projections = self._project(
+            self.coords[s_idxes],
+            self.coords[s_idxes + 1],
+            between_coords,
+        )
+        for i, coord, s_idx, projection in zip(
+            between_idxes,
+            map(tuple, between_coords.tolist()),
+            s_idxes.tolist(),
+            projections.tolist(),
+        ):
+            seg_start = self.coord_tuples[s_idx]
+            keys[i] = self.cumulative_distances[seg_start] + projection
+            self._sort_cache[coord] = keys[i]
+        return keys
+
+    def get_positioned_coords(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The coordinates of the boundary going around it twice,
+        so that parts of it can wrap around its start,
+        along with the position of each along the way.
+        These are computed once and shared by every cut of the boundary.
+        """
+
+        if self._positioned_coords is not None:
+            return self._positioned_coords
+
+        coords = self.coords
+        if self.line.is_closed:
+            coords = coords[:-1]
+        length = self.line.length
+
+        positions = np.array(self.get_coord_sort_keys(coords))
+        coords = np.concatenate([coords, coords])
+        positions = np.concatenate([positions, positions + length])
+
+        if self.line.is_closed:
+            coords = np.concatenate([coords, coords[:1]])
+            positions = np.append(positions, 2*length)
+
+        self._positioned_coords = (coords, positions)
+        return self._positioned_coords
+
     def add_closed_intersection(
         self,
         other, #: Boundary,
@@ -126,13 +308,57 @@ class Boundary(object):
     def get_intersections(self) -> ItemsView[NeighborIdx, List[LineString]]:
         return self._intersections.items()
 
-    def add_cutpoint(self, cutpoint: Point) -> None:
-        key = self.get_point_sort_key(cutpoint)
+    def add_cutpoint(self, cutpoint: Coord) -> None:
+        key = self.get_coord_sort_key(cutpoint)
         self._cutpoints[key] = cutpoint
-
-    def get_cutpoints(self) -> List[Point]:
+        self._ordered_cutpoints = None
+
+    def add_cutpoints(self, cutpoints: List[Coord]) -> None:
+        if len(cutpoints) == 0:
+            return
+
+        # Drop repeated cutpoints before computing their sort keys.
+        # The last occurrence of each is kept in place
+        # so the result matches adding them one by one.
+        coords = np.array(cutpoints, dtype=np.float64)
+        _unique_coords, last_idxes = np.unique(
+            coords[::-1],
+            axis=0,
+            return_index=True,
+        )
+        unique_idxes = np.sort(len(coords) - 1 - last_idxes)
+        unique_cutpoints = [cutpoints[i] for i in unique_idxes]
+        keys = self.get_coord_sort_keys(coords[unique_idxes])
+        for key, cutpoint in zip(keys, unique_cutpoints):
+            self._cutpoints[key] = cutpoint
+        self._ordered_cutpoints = None
+
+    def get_cutpoints(self) -> List[Coord]:
         return list(self._cutpoints.values())
 
+    def get_cutpoints_between(self, start: Coord, end: Coord) -> List[Coord]:
+        """
+        The cutpoints from `start` to `end` inclusive,
+        going forward along the boundary and around its start if need be.
+        Both `start` and `end` are expected to be cutpoints.
+        """
+
+        if self._ordered_cutpoints is None:
+            cutpoints = list(self._cutpoints.values())
+            self._ordered_cutpoints = (
+                cutpoints,
+                {cutpoint: i for i, cutpoint in enumerate(cutpoints)},
+            )
+        cutpoints, cutpoint_idxes = self._ordered_cutpoints
+
+        # Where the cutpoints are in order is looked up directly,
+        # without working out where they are along the boundary.
+        start_idx = cutpoint_idxes[start]
+        end_idx = cutpoint_idxes[end]
+        if start_idx < end_idx:
+            return cutpoints[start_idx:end_idx+1]
+        return cutpoints[start_idx:] + cutpoints[:end_idx+1]
+
     def set_segments(self, segments: List[Segment]) -> None:
         assert len(self._cutpoints) == len(segments), \
             "Expect number of segments " \
@@ -145,20 +371,43 @@ class Boundary(object):
             [] for i in range(len(self.segments))
         ]
 
+        # How a segment is looked up only depends on how many there are,
+        # so the lookup is picked once here rather than on every call.
+        if len(self.segments) == 1:
+            self._get_segment_idx_and_orientation = \
+                self._get_closed_segment_idx_and_orientation
+        elif len(self.segments) == 2:
+            self._get_segment_idx_and_orientation = \
+                self._get_paired_segment_idx_and_orientation
+        else:
+            self._get_segment_idx_and_orientation = \
+                self._get_mapped_segment_idx_and_orientation
+            # Segments keyed in both directions along with their orientation,
+            # so they are found in a single probe either way.
+            # A segment in the forward direction takes precedence.
+            self._oriented_segment_map = {
+                (s.end, s.start): (i, Orientation.BACKWARD)
+                for i, s in enumerate(self.segments)
+            }
+            self._oriented_segment_map.update({
+                key: (i, Orientation.FORWARD)
+                for key, i in self._segment_map.items()
+            })
+
     def add_potential_reference(
         self,
         reference: Segment,
     ) -> None:
-        idx, _orientation = self._get_segment_idx_and_orientation(
+        idx, orientation = self._get_segment_idx_and_orientation(
             reference.start,
             reference.end,
             reference.line
         )
-        self._potential_references[idx].append(reference)
+        self._potential_references[idx].append((reference, orientation))
 
     def get_segments_with_potential_references(
         self
-    ) -> List[Tuple[Segment, List[Segment]]]:
+    ) -> List[Tuple[Segment, List[Tuple[Segment, Orientation]]]]:
         assert len(self.segments) == len(self._potential_references)
         return list(zip(self.segments, self._potential_references))
 
@@ -170,63 +419,75 @@ class Boundary(object):
         )
         return orientation
 
-    def _get_segment_idx_and_orientation(
+    def _get_unset_segment_idx_and_orientation(
         self,
-        start: int,
-        end: int,
+        start: Coord,
+        end: Coord,
         line: LineString,
     ) -> Tuple[int, Orientation]:
-        assert self._segment_map is not None and self.segments is not None
+        # Replaced in `set_segments` by the lookup for that many segments.
+        raise Exception("Expect segments to be set before looking them up.")
 
-        if len(self.segments) == 1:
-            if line.equals(self.line):
-                idx = 0
-                orientation = Orientation.FORWARD
-            else:
-                raise Exception(
-                    "Could not find segment idx "
-                    "for given closed line."
-                )
-        elif len(self.segments) == 2:
-            first_idx = self._segment_map[(start, end)]
-            first_segment = self.segments[first_idx]
-            second_idx = self._segment_map[(end, start)]
-            second_segment = self.segments[second_idx]
-            reverse_line = LineString(line.coords[::-1])
-
-            if first_segment.line.equals(line):
-                idx = first_idx
-                orientation = Orientation.FORWARD
-            elif first_segment.line.equals(reverse_line):
-                idx = first_idx
-                orientation = Orientation.BACKWARD
-            elif second_segment.line.equals(line):
-                idx = second_idx
-                orientation = Orientation.BACKWARD
-            elif second_segment.line.equals(reverse_line):
-                idx = second_idx
-                orientation = Orientation.FORWARD
-            else:
-                raise Exception(
-                    "Could not find segment idx for "
-                    "given start and end points and line."
-                )
+    def _get_closed_segment_idx_and_orientation(
+        self,
+        start: Coord,
+        end: Coord,
+        line: LineString,
+    ) -> Tuple[int, Orientation]:
+        if line.equals(self.line):
+            idx = 0
+            orientation = Orientation.FORWARD
         else:
-            if (start, end) in self._segment_map:
-                idx = self._segment_map[(start, end)]
-                orientation = Orientation.FORWARD
-            elif (end, start) in self._segment_map:
-                idx = self._segment_map[(end, start)]
-                orientation = Orientation.BACKWARD
-            else:
-                raise Exception(
-                    "Could not find segment idx "
-                    "for given start and end points."
-                )
+            raise Exception(
+                "Could not find segment idx "
+                "for given closed line."
+            )
 
         return idx, orientation
 
-    def get_segment(self, start: int, end: int) -> Segment:
+    def _get_paired_segment_idx_and_orientation(
+        self,
+        start: Coord,
+        end: Coord,
+        line: LineString,
+    ) -> Tuple[int, Orientation]:
+        first_idx = self._segment_map[(start, end)]
+        first_segment = self.segments[first_idx]
+        second_idx = self._segment_map[(end, start)]
+        second_segment = self.segments[second_idx]
+
+        # Equality is topological, so a line equals its own reverse
+        # and there is no need to also compare against that.
+        if first_segment.line.equals(line):
+            idx = first_idx
+            orientation = Orientation.FORWARD
+        elif second_segment.line.equals(line):
+            idx = second_idx
+            orientation = Orientation.BACKWARD
+        else:
+            raise Exception(
+                "Could not find segment idx for "
+                "given start and end points and line."
+            )
+
+        return idx, orientation
+
+    def _get_mapped_segment_idx_and_orientation(
+        self,
+        start: Coord,
+        end: Coord,
+        line: LineString,
+    ) -> Tuple[int, Orientation]:
+        idx_and_orientation = self._oriented_segment_map.get((start, end))
+        if idx_and_orientation is None:
+            raise Exception(
+                "Could not find segment idx "
+                "for given start and end points."
+            )
+
+        return idx_and_orientation
+
+    def get_segment(self, start: Coord, end: Coord) -> Segment:
         assert self._segment_map is not None and self.segments is not None
 
         idx = self._segment_map[(start, end)]
@@ -235,13 +496,20 @@ class Boundary(object):
     def rebuild(self) -> None:
         assert self.segments is not None
 
-        segments = []
         for segment in self.segments:
             segment.rebuild()
-            segments.append(segment.modified_line)
 
-        modified_line = LineString(
-            [c for segment in segments for c in segment.coords[:-1]]
-            + [segments[-1].coords[-1]]
+        # Join the segments' coordinates in one go, dropping the end
+        # of each segment but the last, as it is the start of the next.
+        coords = np.concatenate(
+            [segment.modified_coords[:-1] for segment in self.segments]
+            + [self.segments[-1].modified_coords[-1:]]
         )
-        self.modified_line = modified_line
+        self.modified_coords = coords
+        self._modified_line = None
+
+    @property
+    def modified_line(self) -> LineString | None:
+        if self._modified_line is None and self.modified_coords is not None:
+            self._modified_line = shapely.linestrings(self.modified_coords)
+        return self._modified_line
@@ -1,16 +1,22 @@
-from typing import Callable, List
+from typing import Iterator, List, Tuple
 
-from shapely.geometry import LineString, Point
+import numpy as np
+import shapely
+from shapely.geometry import LineString
 
-from .boundary import Boundary
-from .positioned_point import PositionedPoint
+from .boundary import Boundary, Coord
+from .sections import linestrings_from_sections
+
+# Below this many coordinates, walking them one by one
+# is faster than the array operations that replace the walk.
+_MIN_COORDS_TO_CUT_IN_BULK = 256
 
 
 class BoundaryCutter:
     def __init__(
         self,
         boundary: Boundary,
-        cutpoints: List[Point],
+        cutpoints: List[Coord],
     ) -> None:
         self.boundary = boundary
         self.cutpoints = cutpoints
@@ -18,89 +24,220 @@ class BoundaryCutter:
         self._preprocess()
 
     def _preprocess(self) -> None:
-        self._positioned_coords = self._get_positioned_coords()
-        self._positioned_cutpoints = self._get_positioned_cutpoints()
-
-    def _get_positioned_cutpoints(self) -> List[PositionedPoint]:
-        positioned_cutpoints: List[PositionedPoint] = []
-        for i, cutpoint in enumerate(self.cutpoints):
-            position = self.boundary.get_point_sort_key(cutpoint)
-            if i > 0 and position <= positioned_cutpoints[i-1].position:
-                position += self.boundary.line.length
-                assert position > positioned_cutpoints[i-1].position, \
-                    "Expect current position to be " \
-                    "greater than previous position."
-            positioned_cutpoint = PositionedPoint(cutpoint, position)
-            positioned_cutpoints.append(positioned_cutpoint)
-        return positioned_cutpoints
-
-    def _get_positioned_coords(self) -> List[Point]:
-        coords = [Point(c) for c in self.boundary.line.coords]
-        if self.boundary.line.is_closed:
-            coords = coords[:-1]
-
-        first_boundary = [
-            PositionedPoint(coord, self.boundary.get_point_sort_key(coord))
-            for coord in coords
-        ]
-        second_boundary = [
-            PositionedPoint(
-                positioned_point.point,
-                positioned_point.position + self.boundary.line.length
-            ) for positioned_point in first_boundary
-        ]
+        # Coordinates and their positions along the boundary
+        # are kept in parallel arrays rather than as point objects.
+        self._coords, self._coord_positions = \
+            self.boundary.get_positioned_coords()
+        self._cutpoint_coords = \
+            np.array(self.cutpoints, dtype=np.float64).reshape(-1, 2)
+        self._cutpoint_positions = self._get_cutpoint_positions()
 
-        if self.boundary.line.is_closed:
-            positioned_point = \
-                PositionedPoint(coords[0], 2*self.boundary.line.length)
-            second_boundary.append(positioned_point)
-        return first_boundary + second_boundary
+    def _get_cutpoint_positions(self) -> List[float]:
+        positions = np.array(
+            self.boundary.get_coord_sort_keys(self._cutpoint_coords)
+        )
+        # Once the cutpoints wrap around the start of the boundary,
+        # they are all positioned in its second time around.
+        is_wrapped = np.zeros(len(positions), dtype=bool)
+        is_wrapped[1:] = np.logical_or.accumulate(
+            positions[1:] <= positions[:-1]
+        )
+        positions[is_wrapped] += self.boundary.line.length
+        assert np.all(positions[1:] > positions[:-1]), \
+            "Expect current position to be " \
+            "greater than previous position."
+        return positions.tolist()
 
-    def _get_segments_between_cutpoints(self) -> List[LineString]:
-        segments: List[LineString] = []
-        segment_coords: None | List[Point] = None
+    # Coordinates before the first cutpoint is reached add nothing,
+    # and nothing is added once the last cutpoint is reached,
+    # so only the coordinates in between are walked.
+    def _get_walked_positions(self) -> Iterator[Tuple[int, float]]:
+        positions = self._coord_positions
+        if len(self._cutpoint_positions) == 0:
+            return iter([])
+
+        is_first_reached = positions >= self._cutpoint_positions[0]
+        first_idx = int(np.argmax(is_first_reached))
+        if not is_first_reached[first_idx]:
+            return iter([])
+
+        is_last_reached = \
+            positions[first_idx:] >= self._cutpoint_positions[-1]
+        last_idx = first_idx + int(np.argmax(is_last_reached))
+        if not is_last_reached[last_idx - first_idx]:
+            last_idx = len(positions) - 1
+
+        return enumerate(
+            positions[first_idx:last_idx + 1].tolist(),
+            first_idx,
+        )
+
+    # Sections are given as indices into the cutpoint coordinates
+    # followed by the boundary coordinates, along with their sizes.
+    def _get_section_idxes(self) -> Tuple[List[int], List[int]]:
+        cutpoint_positions = self._cutpoint_positions
+        num_cutpoints = len(cutpoint_positions)
+        coord_offset = num_cutpoints
+
+        sections: List[List[int]] = []
+        section: None | List[int] = None
         cutpoint_idx: int = 0
 
-        for positioned_coord in self._positioned_coords:
-            if cutpoint_idx == len(self._positioned_cutpoints):
+        for i, position in self._get_walked_positions():
+            if cutpoint_idx == num_cutpoints:
                 break
 
-            if positioned_coord.position \
-                    < self._positioned_cutpoints[cutpoint_idx].position:
-                if segment_coords is None:
+            if position < cutpoint_positions[cutpoint_idx]:
+                if section is None:
                     continue
                 else:
-                    segment_coords.append(positioned_coord.point)
+                    section.append(coord_offset + i)
             else:
-                if segment_coords is None:
-                    segment_coords = []
-                while cutpoint_idx < len(self._positioned_cutpoints) \
-                        and positioned_coord.position \
-                        >= self._positioned_cutpoints[cutpoint_idx].position:
-                    segment_coords.append(
-                        self._positioned_cutpoints[cutpoint_idx].point
-                    )
+                if section is None:
+                    section = []
+                while cutpoint_idx < num_cutpoints \
+                        and position >= cutpoint_positions[cutpoint_idx]:
+                    section.append(cutpoint_idx)
                     if cutpoint_idx > 0:
-                        segments.append(LineString(segment_coords))
-                        segment_coords = [
-                            self._positioned_cutpoints[cutpoint_idx].point
-                        ]
-                        if positioned_coord.position \
-                                > self._positioned_cutpoints[
-                                    cutpoint_idx
-                                ].position \
-                                and positioned_coord.position \
-                                < self._positioned_cutpoints[
-                                    cutpoint_idx+1
-                                ].position:
-                            segment_coords.append(positioned_coord.point)
+                        sections.append(section)
+                        section = [cutpoint_idx]
+                        if position > cutpoint_positions[cutpoint_idx] \
+                                and position \
+                                < cutpoint_positions[cutpoint_idx+1]:
+                            section.append(coord_offset + i)
                     cutpoint_idx += 1
 
+        section_idxes = [idx for section in sections for idx in section]
+        section_sizes = [len(section) for section in sections]
+        return section_idxes, section_sizes
+
+    def _get_section_idxes_in_bulk(
+        self,
+    ) -> Tuple[np.ndarray, np.ndarray] | None:
+        """
+        Same as `_get_section_idxes`, but with array operations
+        in place of walking the coordinates one by one.
+        Returns None if there are too few coordinates for it to pay off,
+        or where the walk does not reduce to index ranges,
+        i.e. if the coordinate positions ever fail to increase
+        or the last cutpoint is not at a coordinate.
+        """
+
+        positions = self._coord_positions
+        cutpoint_positions = np.array(self._cutpoint_positions)
+        num_cutpoints = len(cutpoint_positions)
+        if len(positions) < _MIN_COORDS_TO_CUT_IN_BULK \
+                or num_cutpoints < 2 \
+                or np.any(positions[1:] <= positions[:-1]):
+            return None
+
+        # The coordinate at which the walk reaches each cutpoint.
+        reached_idxes = np.searchsorted(positions, cutpoint_positions)
+        last_idx = reached_idxes[-1]
+        if last_idx == len(positions) \
+                or positions[last_idx] != cutpoint_positions[-1]:
+            return None
+
+        # Each section runs from one cutpoint to the next
+        # through the coordinates up to where the next one is reached.
+        # The coordinate at which a cutpoint is reached
+        # is only included if it lies past the cutpoint,
+        # except for the first cutpoint, where it never is.
+        prev_idxes = reached_idxes[:-1]
+        prev_positions = positions[prev_idxes]
+        is_included = (prev_positions > cutpoint_positions[:-1]) \
+            & (prev_positions < cutpoint_positions[1:])
+        is_included[0] = False
+        first_idxes = prev_idxes + 1 - is_included
+        num_coords = np.maximum(reached_idxes[1:] - first_idxes, 0)
+
+        section_sizes = num_coords + 2
+        section_starts = np.cumsum(section_sizes) - section_sizes
+        section_idxes = np.arange(section_sizes.sum()) \
+            - np.repeat(section_starts, section_sizes) \
+            + np.repeat(num_cutpoints + first_idxes - 1, section_sizes)
+        section_idxes[section_starts] = np.arange(num_cutpoints - 1)
+        section_idxes[section_starts + section_sizes - 1] = \
+            np.arange(1, num_cutpoints)
+        return section_idxes, section_sizes
+
+    def _get_segments_between_cutpoints(self) -> List[LineString]:
+        sections = self._get_section_idxes_in_bulk()
+        if sections is None:
+            sections = self._get_section_idxes()
+        section_idxes, section_sizes = sections
+
+        # Gather just the coordinates the sections use,
+        # rather than joining the cutpoint coordinates
+        # onto the coordinates twice around the boundary first.
+        section_idxes = np.asarray(section_idxes, dtype=np.intp)
+        is_cutpoint = section_idxes < len(self._cutpoint_coords)
+        coords = np.empty((len(section_idxes), 2))
+        coords[is_cutpoint] = self._cutpoint_coords[section_idxes[is_cutpoint]]
+        coords[~is_cutpoint] = self._coords[
+            section_idxes[~is_cutpoint] - len(self._cutpoint_coords)
+        ]
+
+        # Construct all the segments at once.
+        segments = linestrings_from_sections(coords, section_sizes)
         return segments
 
+    def _get_single_segment(self) -> LineString | None:
+        """
+        Same as `_get_segments_between_cutpoints` for just two cutpoints,
+        without walking the coordinates for the one section between them.
+        Returns None where the walk would not close that section.
+        """
+
+        positions = self._coord_positions
+        start_position, end_position = self._cutpoint_positions
+
+        is_start_reached = positions >= start_position
+        start_idx = int(np.argmax(is_start_reached))
+        if not is_start_reached[start_idx]:
+            return None
+
+        # The coordinate at which the start is reached is never included,
+        # and the section runs up to the first one past it
+        # at which the end is reached.
+        if positions[start_idx] >= end_position:
+            end_idx = start_idx
+        else:
+            is_end_reached = positions[start_idx+1:] >= end_position
+            if len(is_end_reached) == 0:
+                return None
+            end_idx = start_idx + 1 + int(np.argmax(is_end_reached))
+        if positions[end_idx] != end_position:
+            return None
+
+        coords = np.concatenate([
+            self._cutpoint_coords[:1],
+            self._coords[start_idx+1:end_idx],
+            self._cutpoint_coords[1:],
+        ])
+        return shapely.linestrings(coords)
+
     def cut_boundary(self) -> List[LineString]:
+        # Cutting out a single segment is common enough
+        # to be worth its own path.
+        segment = None
+        if len(self.cutpoints) == 2:
+            segment = self._get_single_segment()
+        if segment is not None:
+            return [segment]
+
         segments = self._get_segments_between_cutpoints()
         assert len(segments) == len(self.cutpoints) - 1, \
             "Expect number of segments to be one " \
             "less than number of inputted cutpoints."
         return segments
+
+
+def cut_segment(boundary: Boundary, start: Coord, end: Coord) -> LineString:
+    """
+    Cut the part of the boundary from `start` to `end`.
+    """
+
+    boundary_cutter = BoundaryCutter(boundary, [start, end])
+    segments = boundary_cutter.cut_boundary()
+    return segments[0]
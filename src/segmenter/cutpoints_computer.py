@@ -1,8 +1,8 @@
 from typing import List
 
-from shapely.geometry import LineString, Point
+from shapely.geometry import LineString
 
-from .boundary_cutter import BoundaryCutter
+from .boundary_cutter import cut_segment
 
 """
 Computes cutpoints of boundaries by which to then split them into segments.
@@ -16,42 +16,53 @@ class CutpointsComputer:
     ) -> None:
         self.boundaries = boundaries
 
-    def _use_cutpoints_from_neighbor_start_points(self) -> None:
-        for b in range(len(self.boundaries)):
-            curr_boundary = self.boundaries[b]
-            for n, _segments in curr_boundary.get_intersections():
-                other_boundary = self.boundaries[n]
+    def _use_cutpoints_from_neighbor_start_points(self, b: int) -> None:
+        curr_boundary = self.boundaries[b]
+        for n, _segments in curr_boundary.get_intersections():
+            # Intersections are recorded on both boundaries,
+            # and each pair adds its cutpoints both ways at once.
+            if n <= b:
+                continue  # handled already
+            other_boundary = self.boundaries[n]
 
-                other_start = Point(other_boundary.line.coords[0])
-                on_curr_boundary = curr_boundary.on_boundary(other_start)
-                if on_curr_boundary:
-                    curr_boundary.add_cutpoint(other_start)
+            other_start = other_boundary.coord_tuples[0]
+            on_curr_boundary = curr_boundary.on_boundary(
+                other_start,
+                other_boundary.get_start_point(),
+            )
+            if on_curr_boundary:
+                curr_boundary.add_cutpoint(other_start)
 
-                curr_start = Point(curr_boundary.line.coords[0])
-                on_other_boundary = other_boundary.on_boundary(curr_start)
-                if on_other_boundary:
-                    other_boundary.add_cutpoint(curr_start)
+            curr_start = curr_boundary.coord_tuples[0]
+            on_other_boundary = other_boundary.on_boundary(
+                curr_start,
+                curr_boundary.get_start_point(),
+            )
+            if on_other_boundary:
+                other_boundary.add_cutpoint(curr_start)
 
-    def _use_cutpoints_from_intersection_endpoints(self) -> None:
-        for b in range(len(self.boundaries)):
-            boundary = self.boundaries[b]
-            boundary_start_end = Point(boundary.line.coords[0])
+    def _use_cutpoints_from_intersection_endpoints(self, b: int) -> None:
+        boundary = self.boundaries[b]
+        boundary_start_end = boundary.coord_tuples[0]
 
-            cutpoints = [boundary_start_end]
-            for _n, intersection_segments in boundary.get_intersections():
-                for intersection_segment in intersection_segments:
-                    if intersection_segment.is_closed:
-                        continue
-                    start = Point(intersection_segment.coords[0])
-                    end = Point(intersection_segment.coords[-1])
-                    cutpoints.extend([start, end])
+        cutpoints = [boundary_start_end]
+        for _n, intersection_segments in boundary.get_intersections():
+            for intersection_segment in intersection_segments:
+                if intersection_segment.is_closed:
+                    continue
+                coords = intersection_segment.coords
+                cutpoints.extend([coords[0], coords[-1]])
 
-            for cutpoint in cutpoints:
-                boundary.add_cutpoint(cutpoint)
+        boundary.add_cutpoints(cutpoints)
 
     def compute_cutpoints(self) -> None:
-        self._use_cutpoints_from_neighbor_start_points()
-        self._use_cutpoints_from_intersection_endpoints()
+        # A boundary only gets neighbor start points from pairs
+        # with the boundaries before it and from its own pairs,
+        # so it has all of them by the time its own endpoints are added,
+        # and both are done in a single pass over the boundaries.
+        for b in range(len(self.boundaries)):
+            self._use_cutpoints_from_neighbor_start_points(b)
+            self._use_cutpoints_from_intersection_endpoints(b)
 
     def compute_border_cutpoints(self, border: LineString) -> None:
         for b in range(len(self.boundaries)):
@@ -61,19 +72,9 @@ class CutpointsComputer:
 
             keep_all = len(intersections) == 1 and intersections[0].is_closed
             if keep_all:
-                for coord in list(curr_boundary.line.coords):
-                    cutpoint = Point(coord)
-                    curr_boundary.add_cutpoint(cutpoint)
+                curr_boundary.add_cutpoints(curr_boundary.coord_tuples)
             else:
                 for intersection in intersections:
-                    start = Point(intersection.coords[0])
-                    end = Point(intersection.coords[-1])
-                    boundary_cutter = BoundaryCutter(
-                        curr_boundary,
-                        [start, end]
-                    )
-                    segments = boundary_cutter.cut_boundary()
-                    segment = segments[0]
-                    for coord in list(segment.coords):
-                        cutpoint = Point(coord)
-                        curr_boundary.add_cutpoint(cutpoint)
+                    coords = intersection.coords
+                    segment = cut_segment(curr_boundary, coords[0], coords[-1])
+                    curr_boundary.add_cutpoints(list(segment.coords))
@@ -1,15 +1,14 @@
-from typing import Dict, List, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 
+import numpy as np
+import shapely
 from shapely import Geometry
-from shapely.geometry import \
-    GeometryCollection, \
-    LineString, \
-    MultiLineString, \
-    Point
-from rtree import index
-
-from .boundary import Boundary
+from shapely.geometry import LineString
+
+from .boundary import Boundary, Coord
 from .piece import Piece
+from .sections import linestrings_from_sections
 
 
 """
@@ -17,112 +16,109 @@ Computes intersections between boundaries, each of which keeps a record
 of which other boundaries it intersected with and where.
 """
 
+# Below this many pairs, splitting the intersections across threads
+# costs more than it saves.
+_MIN_PAIRS_TO_THREAD = 10000
+# Geometries whose parts are walked for intersection pieces.
+_COLLECTION_TYPES = {"MultiLineString", "GeometryCollection"}
+
 
 class IntersectionsComputer:
     def __init__(
         self,
         boundaries: List[LineString],
+        workers: int = 1,
     ) -> None:
         self.boundaries = boundaries
-
-    def _make_index(self) -> index.Index:
-        boundary_idx = index.Index()
-        for i, boundary in enumerate(self.boundaries):
-            bbox = boundary.line.bounds
-            boundary_idx.insert(i, bbox)
-        return boundary_idx
-
-    def _line_string(self, ls: LineString) -> List[Piece]:
-        if len(ls.coords) < 2:
-            return []  # invalid segment, effectively skip
-        return [Piece(ls)]
-
-    def _multi_line_string(self, mls: MultiLineString) -> List[Piece]:
-        pieces = []
-        for b in mls.geoms:
-            pieces.extend(self._line_string(b))
-        return pieces
-
-    def _geometry_collection(self, gc: GeometryCollection) -> List[Piece]:
-        pieces = []
-        for g in gc.geoms:
-            pieces.extend(self._handle(g))
-        return pieces
+        self.workers = workers
+        # The boundary lines are kept together in one array
+        # so they can be queried and intersected in bulk.
+        self._lines = np.array(
+            [boundary.line for boundary in self.boundaries],
+            dtype=object,
+        )
 
     def _handle(self, g: Geometry) -> List[Piece]:
+        # Walk the geometry tree with an explicit stack,
+        # in the same depth-first order as recursing into it would.
         pieces = []
-        if g.geom_type == "LineString":
-            pieces = self._line_string(g)
-        elif g.geom_type == "MultiLineString":
-            pieces = self._multi_line_string(g)
-        elif g.geom_type == "GeometryCollection":
-            pieces = self._geometry_collection(g)
-        else:
+        stack = [g]
+        while len(stack) > 0:
+            geometry = stack.pop()
+            geom_type = geometry.geom_type
+            if geom_type == "LineString":
+                if len(geometry.coords) >= 2:  # else invalid, skip
+                    pieces.append(Piece(geometry))
+            elif geom_type in _COLLECTION_TYPES:
+                stack.extend(reversed(geometry.geoms))
             # skip Point, MultiPoint or non-existent intersection
-            pass
         return pieces
 
-    def _get_connected_segment(
-        self,
-        start_map: Dict[Point, Piece],
-        end_map: Dict[Point, Piece],
-        unvisited: Set[Piece],
-        piece: Piece,
-    ) -> LineString:
-        curr = piece.start
-        former_section = [piece.start]
-        while curr in end_map:
-            prev_piece = end_map[curr]
-            curr = prev_piece.start
-            former_section.append(curr)
-            if prev_piece not in unvisited:
-                break  # reached termination in former half of segment
-            unvisited.remove(prev_piece)
-
-        is_closed = len(former_section) > 2 \
-            and Point(former_section[-1]) == piece.start
-        if is_closed:
-            latter_section = []
-        else:
-            curr = piece.end
-            latter_section = [piece.end]
-            while curr in start_map:
-                next_piece = start_map[curr]
-                curr = Point(next_piece.end)
-                latter_section.append(curr)
-                if next_piece not in unvisited:
-                    break  # reached termination in latter half of segment
-                unvisited.remove(next_piece)
-
-        segment = LineString(former_section[::-1] + latter_section)
-        return segment
+    def _find(self, parents: List[int], i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]  # halve the path as we go
+            i = parents[i]
+        return i
 
     def _get_connected_segments(self, pieces: List[Piece]) -> List[LineString]:
         if len(pieces) == 0:
             return []
-
-        start_map: Dict[Point, Piece] = {}
-        end_map: Dict[Point, Piece] = {}
-        for p in pieces:
-            start_map[p.start] = p
-            end_map[p.end] = p
-
-        segments = []
-        unvisited = set(pieces)
-        while len(unvisited) > 0:
-            piece = unvisited.pop()
-            segment = self._get_connected_segment(
-                start_map,
-                end_map,
-                unvisited,
-                piece
-            )
-            segments.append(segment)
-
+        if len(pieces) == 1:
+            # Most intersections are a single piece,
+            # which is its own segment.
+            return [pieces[0].ls]
+
+        starts: List[Coord] = [p.start for p in pieces]
+        ends: List[Coord] = [p.end for p in pieces]
+        start_map: Dict[Coord, int] = {c: i for i, c in enumerate(starts)}
+        end_map: Dict[Coord, int] = {c: i for i, c in enumerate(ends)}
+
+        # Group the pieces into connected components
+        # by joining each piece with the piece that continues from its end.
+        parents = list(range(len(pieces)))
+        for i, end in enumerate(ends):
+            if end in start_map:
+                root = self._find(parents, i)
+                other_root = self._find(parents, start_map[end])
+                parents[other_root] = root
+
+        components: Dict[int, List[int]] = {}
+        for i in range(len(pieces)):
+            components.setdefault(self._find(parents, i), []).append(i)
+
+        # Thread each component from a piece that nothing leads into.
+        # A component without one is closed,
+        # in which case it is threaded around from any of its pieces.
+        sections = []
+        visited = [False] * len(pieces)
+        for component in components.values():
+            heads = [i for i in component if starts[i] not in end_map]
+            for head in heads + component:
+                if visited[head]:
+                    continue
+                section = [starts[head]]
+                i = head
+                while not visited[i]:
+                    visited[i] = True
+                    section.append(ends[i])
+                    if ends[i] not in start_map:
+                        break
+                    i = start_map[ends[i]]
+                sections.append(section)
+
+        # Construct all the segments at once.
+        segments = linestrings_from_sections(
+            np.array([c for section in sections for c in section]),
+            [len(section) for section in sections],
+        )
         return segments
 
-    def _compute_intersection(self, curr: Boundary, other: Boundary) -> None:
-        intersection = curr.line.intersection(other.line)
+    def _compute_intersection(
+        self,
+        curr: Boundary,
+        other: Boundary,
+        intersection: Geometry,
+    ) -> None:
         intersection_pieces = self._handle(intersection)
 
         intersection_segments =\
@@ -146,26 +142,87 @@ class IntersectionsComputer:
             curr.add_intersection(other, intersection_segments)
             other.add_intersection(curr, intersection_segments)
 
-    def compute_intersections(self) -> None:
-        boundary_idx = self._make_index()
+    def _intersect(self, lefts: np.ndarray, rights: np.ndarray) -> np.ndarray:
+        if self.workers <= 1 or len(lefts) < _MIN_PAIRS_TO_THREAD:
+            return shapely.intersection(lefts, rights)
+
+        # GEOS releases the GIL during intersections,
+        # so chunks of pairs can be intersected in parallel with threads.
+        chunk_size = max(1, len(lefts) // (8 * self.workers))
+        chunk_starts = range(0, len(lefts), chunk_size)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            chunks = list(executor.map(
+                lambda i: shapely.intersection(
+                    lefts[i:i+chunk_size],
+                    rights[i:i+chunk_size],
+                ),
+                chunk_starts,
+            ))
+        return np.concatenate(chunks)
 
-        for b in range(len(self.boundaries)):
+    def compute_intersections(self) -> None:
+        lines = self._lines
+
+        # Find every pair of intersecting boundaries in one bulk query,
+        # keeping each pair only once.
+        boundary_idx = shapely.STRtree(lines)
+        curr_idxes, other_idxes = boundary_idx.query(
+            lines,
+            predicate="intersects",
+        )
+        is_new_pair = other_idxes > curr_idxes
+        curr_idxes = curr_idxes[is_new_pair]
+        other_idxes = other_idxes[is_new_pair]
+        order = np.lexsort((other_idxes, curr_idxes))
+        curr_idxes = curr_idxes[order]
+        other_idxes = other_idxes[order]
+        lefts = lines[curr_idxes]
+        rights = lines[other_idxes]
+
+        # A boundary that lies entirely on the other
+        # is their whole intersection, which is then closed,
+        # so only the remaining pairs need to be intersected.
+        is_right_contained = shapely.contains(lefts, rights)
+        is_left_contained = \
+            ~is_right_contained & shapely.contains(rights, lefts)
+        is_contained = is_right_contained | is_left_contained
+        intersections = np.where(is_right_contained, rights, lefts)
+        intersections[~is_contained] = self._intersect(
+            lefts[~is_contained],
+            rights[~is_contained],
+        )
+
+        for b, o, intersection, contained in zip(
+            curr_idxes,
+            other_idxes,
+            intersections,
+            is_contained,
+        ):
             curr_boundary = self.boundaries[b]
-
-            for o in boundary_idx.intersection(curr_boundary.line.bounds):
-                if o == b:
-                    continue
-                if o < b:
-                    continue  # handled already
-                other_boundary = self.boundaries[o]
-
-                self._compute_intersection(curr_boundary, other_boundary)
+            other_boundary = self.boundaries[o]
+            if contained:
+                curr_boundary.add_closed_intersection(
+                    other_boundary,
+                    intersection,
+                )
+                other_boundary.add_closed_intersection(
+                    curr_boundary,
+                    intersection,
+                )
+            else:
+                self._compute_intersection(
+                    curr_boundary,
+                    other_boundary,
+                    intersection,
+                )
 
     def compute_border_intersections(self, border: LineString) -> None:
+        intersections = shapely.intersection(self._lines, border)
+
         for b in range(len(self.boundaries)):
             curr_boundary = self.boundaries[b]
 
-            intersection = curr_boundary.line.intersection(border)
+            intersection = intersections[b]
             intersection_pieces = self._handle(intersection)
 
             intersection_segments =\
@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 from shapely.geometry import LineString
 
+from .boundary import Boundary
 from .boundary_cutter import BoundaryCutter
 from .segment import Segment
 
@@ -10,20 +12,32 @@ class MappingComputer:
     def __init__(
         self,
         boundaries: List[LineString],
+        workers: int = 1,
     ) -> None:
         self.boundaries = boundaries
+        self.workers = workers
+
+    def _compute_segments(self, boundary: Boundary) -> None:
+        # The cutpoints are a fresh list,
+        # so the boundary is closed off in place rather than copied.
+        cutpoints = boundary.get_cutpoints()
+        cutpoints.append(cutpoints[0])
+        boundary_cutter = BoundaryCutter(boundary, cutpoints)
+        segments = [
+            Segment(boundary, sl) for sl in boundary_cutter.cut_boundary()
+        ]
+        boundary.set_segments(segments)
 
     def _compute_segments_per_boundary(self) -> None:
-        for b in range(len(self.boundaries)):
-            boundary = self.boundaries[b]
-
-            cutpoints = boundary.get_cutpoints()
-            cutpoints_with_end = cutpoints + [cutpoints[0]]
-            boundary_cutter = BoundaryCutter(boundary, cutpoints_with_end)
-            segments = [
-                Segment(boundary, sl) for sl in boundary_cutter.cut_boundary()
-            ]
-            boundary.set_segments(segments)
+        if self.workers <= 1:
+            for b in range(len(self.boundaries)):
+                self._compute_segments(self.boundaries[b])
+            return
+
+        # Each boundary is cut into segments on its own,
+        # so the boundaries can be split between threads.
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self._compute_segments, self.boundaries))
 
     def compute_mapping(self) -> None:
         self._compute_segments_per_boundary()
@@ -1,10 +1,16 @@
-from shapely.geometry import LineString, Point
+from typing import Tuple
+
+from shapely.geometry import LineString
 
 
 class Piece:
+    __slots__ = ('ls', 'start', 'end')
+
     def __init__(self, ls: LineString) -> None:
-        assert len(ls.coords) == 2, \
+        coords = ls.coords
+        assert len(coords) == 2, \
             "Expect LineString to make Piece from to have only two points."
         self.ls = ls
-        self.start = Point(self.ls.coords[0])
-        self.end = Point(self.ls.coords[-1])
+        # Endpoints are kept as coordinates to be used as keys directly.
+        self.start: Tuple[float, float] = coords[0]
+        self.end: Tuple[float, float] = coords[-1]
@@ -1,9 +1,9 @@
 from typing import List
 
-from shapely.geometry import LineString, Point
+import numpy as np
+from shapely.geometry import LineString
 
-from .boundary_cutter import BoundaryCutter
-from .boundary import Boundary
+from .boundary import Boundary, Coord
 from .segment import Segment
 
 
@@ -33,18 +33,28 @@ class ReferencesComputer:
         self,
         curr_boundary: Boundary,
     ) -> None:
+        # The whole boundary is shared with each closed neighbor,
+        # so its segments are looked up once for all of them,
+        # and only if there is such a neighbor to handle.
+        segments: List[Segment] | None = None
+
         for o, _closed in curr_boundary.get_closed_intersections():
             if o <= curr_boundary.idx:
                 continue
             other_boundary = self.boundaries[o]
 
-            cutpoints = curr_boundary.get_cutpoints()
-            cutpoints_with_end = cutpoints + [cutpoints[0]]
-
-            for i in range(len(cutpoints_with_end)-1):
-                start = cutpoints_with_end[i]
-                end = cutpoints_with_end[i+1]
-                segment = curr_boundary.get_segment(start, end)
+            if segments is None:
+                cutpoints = curr_boundary.get_cutpoints()
+                # The last segment wraps around to the first cutpoint.
+                n = len(cutpoints)
+                segments = [
+                    curr_boundary.get_segment(
+                        cutpoints[i],
+                        cutpoints[(i+1) % n],
+                    ) for i in range(n)
+                ]
+
+            for segment in segments:
                 other_boundary.add_potential_reference(segment)
 
     # Get cutpoints to split intersection by.
@@ -52,23 +62,11 @@ class ReferencesComputer:
         self,
         boundary: Boundary,
         intersection: LineString,
-    ) -> List[Point]:
-        start = Point(intersection.coords[0])
-        end = Point(intersection.coords[-1])
-
-        cutpoints = boundary.get_cutpoints()
-        cutpoints_with_end = cutpoints + [cutpoints[0]]
-        boundary_with_just_cutpoints = \
-            Boundary(-1, LineString(cutpoints_with_end))
-        boundary_cutter = BoundaryCutter(
-            boundary_with_just_cutpoints,
-            [start, end],
-        )
-        super_segments = boundary_cutter.cut_boundary()
-        super_segment = super_segments[0]
-
-        relevant_cutpoints = [Point(c) for c in super_segment.coords]
-        return relevant_cutpoints
+    ) -> List[Coord]:
+        # The intersection's endpoints are cutpoints of the boundary,
+        # so the cutpoints along it can be read off in order.
+        coords = intersection.coords
+        return boundary.get_cutpoints_between(coords[0], coords[-1])
 
     def _consider_neighbor_for_line_segments(
         self,
@@ -92,38 +90,70 @@ class ReferencesComputer:
                     segment = curr_boundary.get_segment(start, end)
                     other_boundary.add_potential_reference(segment)
 
-    def _compute_reference_options_per_segment(self) -> None:
-        for b in range(len(self.boundaries)):
-            curr_boundary = self.boundaries[b]
-            self._consider_boundary_for_segments(curr_boundary)
+    def _has_neighbor_before(self, boundary: Boundary) -> bool:
+        return any(
+            o < boundary.idx for o, _ in boundary.get_closed_intersections()
+        ) or any(
+            o < boundary.idx for o, _ in boundary.get_intersections()
+        )
 
-        for b in range(len(self.boundaries)):
-            curr_boundary = self.boundaries[b]
-            self._consider_neighbor_for_closed_segments(curr_boundary)
+    def _choose_references(self, boundary: Boundary) -> List[Segment]:
+        # Potential references from other boundaries
+        # only come from the boundaries before this one,
+        # so without any such neighbor,
+        # each segment's only potential reference is itself.
+        if not self._has_neighbor_before(boundary):
+            for segment, potential_references in \
+                    boundary.get_segments_with_potential_references():
+                assert len(potential_references) == 1
+                reference, orientation = potential_references[0]
+                segment.set_reference(reference, orientation)
+            return list(boundary.segments)
+
+        chosen_references = []
+        for segment, potential_references in \
+                boundary.get_segments_with_potential_references():
+            reference, orientation = min(
+                potential_references,
+                key=lambda r: r[0].boundary_idx
+            )
+            segment.set_reference(reference, orientation)
+            chosen_references.append(reference)
+
+        # A segment is a reference where its chosen reference
+        # is on its own boundary, which is found for all of them at once
+        # by comparing the boundary indices as an array.
+        reference_boundary_idxes = np.fromiter(
+            (reference.boundary_idx for reference in chosen_references),
+            dtype=np.int64,
+            count=len(chosen_references),
+        )
+        is_reference = reference_boundary_idxes == boundary.idx
+        return [chosen_references[i] for i in np.flatnonzero(is_reference)]
 
+    def compute_references(self) -> List[Segment]:
+        # A boundary only gets potential references from itself
+        # and from the boundaries before it,
+        # so its references can be chosen as soon as it has been considered,
+        # all in a single pass over the boundaries.
+        # There are at most as many references as segments,
+        # so room for them is made up front and the rest cut off after.
+        num_segments = sum(
+            len(boundary.segments) for boundary in self.boundaries
+        )
+        references: List[Segment | None] = [None] * num_segments
+        num_references = 0
         for b in range(len(self.boundaries)):
             curr_boundary = self.boundaries[b]
+            self._consider_boundary_for_segments(curr_boundary)
+            self._consider_neighbor_for_closed_segments(curr_boundary)
             self._consider_neighbor_for_line_segments(curr_boundary)
 
-    def _choose_references(self) -> List[Segment]:
-        references = []
-        for b in range(len(self.boundaries)):
-            boundary = self.boundaries[b]
+            chosen_references = self._choose_references(curr_boundary)
+            next_num_references = num_references + len(chosen_references)
+            references[num_references:next_num_references] = \
+                chosen_references
+            num_references = next_num_references
+        del references[num_references:]
 
-            for segment, potential_references in \
-                    boundary.get_segments_with_potential_references():
-                reference = min(
-                    potential_references,
-                    key=lambda r: r.boundary.idx
-                )
-                segment.set_reference(reference)
-
-                if segment.is_reference():
-                    references.append(reference)
-
-        return references
-
-    def compute_references(self) -> List[Segment]:
-        self._compute_reference_options_per_segment()
-        references = self._choose_references()
         return references
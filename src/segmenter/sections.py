@@ -0,0 +1,22 @@
+from typing import List
+
+import numpy as np
+import shapely
+from shapely.geometry import LineString
+
+
+def linestrings_from_sections(
+    coords: np.ndarray,
+    section_sizes: List[int],
+) -> List[LineString]:
+    """
+    Build one LineString per consecutive section of `coords`,
+    the sizes of which are given by `section_sizes`,
+    in one vectorized call.
+    """
+
+    if len(section_sizes) == 0:
+        return []
+
+    section_idxes = np.repeat(np.arange(len(section_sizes)), section_sizes)
+    return list(shapely.linestrings(coords, indices=section_idxes))
@@ -1,10 +1,28 @@
-from shapely.geometry import Point
+from typing import Tuple
+
+import numpy as np
+import shapely
 from shapely.geometry import LineString
 
 from .orientation import Orientation
 
 
 class Segment(object):
+    # There is a segment for every part of every boundary,
+    # so they are kept without a per-instance dict.
+    __slots__ = (
+        'boundary',
+        'boundary_idx',
+        'line',
+        'start',
+        'end',
+        '_modified_line',
+        '_modified_coords',
+        '_reference',
+        'reference_boundary_idx',
+        '_orientation',
+    )
+
     def __enter__(self) -> 'Segment':
         return self
 
@@ -14,31 +32,65 @@ class Segment(object):
         line: LineString,
     ) -> None:
         self.boundary = boundary
+        # Segments are compared by the index of their boundary
+        # often enough for it to be kept on them directly.
+        self.boundary_idx: int = boundary.idx
         self.line = line
 
-        self.start = Point(line.coords[0])
-        self.end = Point(line.coords[-1])
+        self.start: Tuple[float, float] = line.coords[0]
+        self.end: Tuple[float, float] = line.coords[-1]
 
         # Can iteratively apply as many operations,
         # which will update this value based on its previous value.
-        self.modified_line = self.line
+        # The modified line and its coordinates are each made
+        # from the other only when first needed.
+        self._modified_line: LineString | None = self.line
+        self._modified_coords: np.ndarray | None = None
 
     def set_reference(
         self,
-        segment #: Segment,
+        segment, #: Segment,
+        orientation: Orientation | None = None,
     ) -> None:
         self._reference = segment
-        self._orientation = \
-            self.boundary.get_orientation(self._reference)
+        self.reference_boundary_idx: int = segment.boundary_idx
+        # The orientation is looked up unless it is already known.
+        if orientation is None:
+            orientation = self.boundary.get_orientation(self._reference)
+        self._orientation = orientation
 
     def is_reference(self) -> bool:
         assert self._reference is not None
-        return self.boundary.idx == self._reference.boundary.idx
+        return self.boundary_idx == self.reference_boundary_idx
+
+    @property
+    def modified_line(self) -> LineString:
+        if self._modified_line is None:
+            self._modified_line = shapely.linestrings(self._modified_coords)
+        return self._modified_line
+
+    @modified_line.setter
+    def modified_line(self, line: LineString) -> None:
+        self._modified_line = line
+        self._modified_coords = None
+
+    @property
+    def modified_coords(self) -> np.ndarray:
+        if self._modified_coords is None:
+            self._modified_coords = \
+                shapely.get_coordinates(self._modified_line)
+        return self._modified_coords
+
+    @modified_coords.setter
+    def modified_coords(self, coords: np.ndarray) -> None:
+        self._modified_coords = coords
+        self._modified_line = None
 
     def rebuild(self) -> None:
         if self._orientation == Orientation.BACKWARD:
-            self.modified_line = LineString(
-                self._reference.modified_line.coords[::-1]
-            )
+            # Reversing the coordinates is only a view of them.
+            self._modified_coords = self._reference.modified_coords[::-1]
+            self._modified_line = None
         else:
-            self.modified_line = self._reference.modified_line
+            self._modified_line = self._reference._modified_line
+            self._modified_coords = self._reference._modified_coords
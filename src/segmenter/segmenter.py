@@ -1,9 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import shapely
 from shapely import errors
 from shapely import Geometry, LineString, Polygon
 from shapely.ops import unary_union
 from typing import Callable, List, Tuple
 
-from .area import Area
 from .boundary import Boundary
 from .clean_polygon import clean_polygon
 from .fix_polygon import fix_polygon
@@ -19,6 +22,7 @@ class Segmenter:
         polygons: List[Polygon],
         labels: List[str],
         pin_border: bool,
+        workers: int = 1,
     ) -> None:
         for p in polygons:
             assert p.geom_type == "Polygon", \
@@ -27,6 +31,8 @@ class Segmenter:
         self.polygons = polygons
         self.labels = labels
         self.pin_border = pin_border
+        # Number of threads to use for the parallelizable steps.
+        self.workers = workers
 
         self._build()
 
@@ -34,10 +40,35 @@ class Segmenter:
         self,
         per_segment_function: Callable[[LineString], LineString]
     ) -> None:
-        for reference in self._references:
-            prev_modified_line = reference.modified_line
-            next_modified_line = per_segment_function(prev_modified_line)
-
+        # A function marked as batched takes every segment at once.
+        if getattr(per_segment_function, "batched", False):
+            self._run_per_segment_in_batch(per_segment_function)
+            return
+
+        prev_modified_lines = [
+            reference.modified_line for reference in self._references
+        ]
+        if self.workers <= 1 \
+                or not getattr(per_segment_function, "releases_gil", False):
+            next_modified_lines = [
+                per_segment_function(line) for line in prev_modified_lines
+            ]
+        else:
+            # Each segment is modified on its own,
+            # so the segments can be split between threads.
+            # Only functions marked as spending their time with the GIL
+            # released are threaded, as others would just contend for it.
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                next_modified_lines = list(executor.map(
+                    per_segment_function,
+                    prev_modified_lines,
+                ))
+
+        for reference, prev_modified_line, next_modified_line in zip(
+            self._references,
+            prev_modified_lines,
+            next_modified_lines,
+        ):
             # start and end points must remain fixed
             assert next_modified_line.coords[0] == prev_modified_line.coords[0]
             assert \
@@ -45,10 +76,70 @@ class Segmenter:
 
             reference.modified_line = next_modified_line
 
+        # The references no longer match their stacked coordinates.
+        self._reference_coords = None
+
+    def _get_reference_coords(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The modified coordinates of all the references stacked together,
+        those of reference i being `coords[offsets[i]:offsets[i+1]]`.
+        """
+
+        if self._reference_coords is None:
+            # Read out of all the references' lines in one call.
+            lines = [reference.modified_line for reference in self._references]
+            coords, reference_idxes = shapely.get_coordinates(
+                np.array(lines, dtype=object),
+                return_index=True,
+            )
+            offsets = np.zeros(len(self._references) + 1, dtype=np.intp)
+            offsets[1:] = np.cumsum(
+                np.bincount(reference_idxes, minlength=len(self._references))
+            )
+            self._reference_coords = (coords, offsets)
+        return self._reference_coords
+
+    def _run_per_segment_in_batch(
+        self,
+        batched_function: Callable[
+            [np.ndarray, np.ndarray],
+            Tuple[np.ndarray, np.ndarray],
+        ],
+    ) -> None:
+        """
+        Runs a function over the coordinates of all the segments at once,
+        those of segment i being `coords[offsets[i]:offsets[i+1]]`.
+        The function returns the modified coordinates and offsets likewise.
+        """
+
+        if len(self._references) == 0:
+            return
+
+        prev_coords, prev_offsets = self._get_reference_coords()
+        next_coords, next_offsets = \
+            batched_function(prev_coords, prev_offsets)
+
+        # start and end points must remain fixed
+        assert np.array_equal(
+            next_coords[next_offsets[:-1]],
+            prev_coords[prev_offsets[:-1]],
+        )
+        assert np.array_equal(
+            next_coords[next_offsets[1:] - 1],
+            prev_coords[prev_offsets[1:] - 1],
+        )
+
+        # The references' coordinates stay views into the stacked ones,
+        # which are kept for the next function to run over as they are.
+        self._reference_coords = (next_coords, next_offsets)
+        for i, reference in enumerate(self._references):
+            reference.modified_coords = \
+                next_coords[next_offsets[i]:next_offsets[i+1]]
+
     def get_result(self) -> Tuple[List[Polygon], List[str]]:
         self._rebuild()
 
-        modified_polygons = [a.modified_polygon for a in self._areas]
+        modified_polygons = self._modified_polygons
         modified_labels = self.labels
 
         modified_polygons, modified_labels = self._fix(
@@ -74,11 +165,17 @@ class Segmenter:
         polygons: List[Polygon],
         labels: List[str],
     ) -> Tuple[List[Polygon], List[str]]:
+        # Validity is checked for all the polygons in one call,
+        # as it is rare for any of them to need fixing.
+        is_valid = shapely.is_valid(np.array(polygons, dtype=object))
+        if np.all(is_valid):
+            return list(polygons), list(labels)
+
         fixed_polygons: List[Polygon] = []
         fixed_labels: List[str] = []
         for i, mp in enumerate(polygons):
             label = labels[i]
-            if not mp.is_valid:
+            if not is_valid[i]:
                 fixed = fix_polygon(mp)
                 fixed_polygons.extend(fixed)
                 fixed_labels.extend([label] * len(fixed))
@@ -106,44 +203,83 @@ class Segmenter:
         self.border: LineString = clean_polygon(union).exterior
 
     def _area_build(self) -> None:
-        areas = [Area(p) for p in self.polygons]
-        self._areas = areas
+        # Areas are kept as parallel lists indexed by polygon
+        # rather than as one object per polygon.
+        self._exteriors: List[Boundary] = []
+        self._interiors: List[List[Boundary]] = []
+        self._modified_polygons: List[Polygon] = []
 
     def _area_rebuild(self) -> None:
-        for i in range(len(self._areas)):
-            area = self._areas[i]
-            area.rebuild()
+        # Stage every ring in polygon order, exterior first,
+        # so all polygons can be constructed in one vectorized call.
+        # The rings are staged as the coordinates the boundaries
+        # were rebuilt into, without making lines out of them first.
+        rings: List[np.ndarray] = []
+        ring_polygon_idxes: List[int] = []
+        for i, (exterior, interiors) \
+                in enumerate(zip(self._exteriors, self._interiors)):
+            rings.append(exterior.modified_coords)
+            rings.extend([interior.modified_coords for interior in interiors])
+            ring_polygon_idxes.extend([i] * (1 + len(interiors)))
+
+        if len(rings) == 0:
+            self._modified_polygons = []
+            return
+
+        coords = np.concatenate(rings)
+        coord_ring_idxes = np.repeat(
+            np.arange(len(rings)),
+            [len(ring) for ring in rings],
+        )
+        linear_rings = shapely.linearrings(coords, indices=coord_ring_idxes)
+        if len(rings) == len(self._exteriors):
+            # No polygon has holes, so every ring is its own shell.
+            modified_polygons = shapely.polygons(linear_rings)
+        else:
+            modified_polygons = shapely.polygons(
+                linear_rings,
+                indices=ring_polygon_idxes,
+            )
+        self._modified_polygons = list(modified_polygons)
 
     def _boundary_build(self) -> None:
         boundaries = []
         boundary_count = 0
 
-        for i in range(len(self._areas)):
-            area = self._areas[i]
-
-            exterior = Boundary(boundary_count, area.polygon.exterior)
+        for polygon in self.polygons:
+            exterior = Boundary(boundary_count, polygon.exterior)
             boundary_count += 1
 
             interiors = [
                 Boundary(boundary_count + j, l) for j, l
-                in enumerate(area.polygon.interiors)
+                in enumerate(polygon.interiors)
             ]
-            boundary_count += len(area.polygon.interiors)
+            boundary_count += len(polygon.interiors)
 
-            area.exterior = exterior
-            area.interiors = interiors
+            self._exteriors.append(exterior)
+            self._interiors.append(interiors)
 
             boundaries.extend([exterior] + interiors)
 
         self._boundaries = boundaries
 
     def _boundary_rebuild(self) -> None:
-        for b in range(len(self._boundaries)):
-            boundary = self._boundaries[b]
-            boundary.rebuild()
+        if self.workers <= 1:
+            for b in range(len(self._boundaries)):
+                boundary = self._boundaries[b]
+                boundary.rebuild()
+            return
+
+        # Each boundary only rebuilds its own segments and modified line,
+        # so the boundaries can be split between threads.
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(Boundary.rebuild, self._boundaries))
 
     def _reference_build(self) -> None:
-        intersections_computer = IntersectionsComputer(self._boundaries)
+        intersections_computer = IntersectionsComputer(
+            self._boundaries,
+            self.workers,
+        )
         intersections_computer.compute_intersections()
         if self.pin_border:
             intersections_computer.compute_border_intersections(self.border)
@@ -153,7 +289,8 @@ class Segmenter:
         if self.pin_border:
             cutpoints_computer.compute_border_cutpoints(self.border)
 
-        MappingComputer(self._boundaries).compute_mapping()
+        MappingComputer(self._boundaries, self.workers).compute_mapping()
 
         references = ReferencesComputer(self._boundaries).compute_references()
         self._references = references
+        self._reference_coords: Tuple[np.ndarray, np.ndarray] | None = None
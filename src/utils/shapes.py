@@ -0,0 +1,32 @@
+from itertools import chain
+from typing import Any, Dict, List
+
+import numpy as np
+import shapely
+
+
+def polygons_from_shapes(geometries: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Convert the GeoJSON polygons yielded by `rasterio.features.shapes`
+    into shapely polygons with one vectorized construction,
+    rather than dispatching `shapely.geometry.shape` per polygon.
+    """
+
+    rings = []
+    ring_polygon_idxes = []
+    for polygon_idx, geometry in enumerate(geometries):
+        # The first ring is the exterior and the rest are interiors.
+        for ring in geometry["coordinates"]:
+            rings.append(ring)
+            ring_polygon_idxes.append(polygon_idx)
+
+    if len(rings) == 0:
+        return np.empty(0, dtype=object)
+
+    ring_sizes = [len(ring) for ring in rings]
+    coords = np.array(list(chain.from_iterable(rings)), dtype=np.float64)
+    coord_ring_idxes = np.repeat(np.arange(len(rings)), ring_sizes)
+
+    linear_rings = shapely.linearrings(coords, indices=coord_ring_idxes)
+    polygons = shapely.polygons(linear_rings, indices=ring_polygon_idxes)
+    return polygons
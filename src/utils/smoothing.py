@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple
 
 from shapely.geometry import Point
 import numpy as np
@@ -9,15 +9,52 @@ def chaikins_corner_cutting(coords: List[Point], refinements=5) -> List[Point]:
     if not coords or len(coords) == 0:
         return coords
 
-    arr = np.array(coords)
+    arr = np.array(coords, dtype=np.float64)
 
     for _ in range(refinements):
-        L = arr.repeat(2, axis=0)
-        R = np.empty_like(L)
-        R[0] = L[0]
-        R[2::2] = L[1:-1:2]
-        R[1:-1:2] = L[2::2]
-        R[-1] = L[-1]
-        arr = L * 0.75 + R * 0.25
+        # Each edge (a, b) is replaced by the points at 1/4 and 3/4 along it,
+        # with the endpoints kept fixed.
+        refined = np.empty((2 * len(arr), arr.shape[1]))
+        refined[0] = arr[0]
+        refined[-1] = arr[-1]
+        refined[1:-1:2] = arr[:-1] * 0.75 + arr[1:] * 0.25
+        refined[2:-1:2] = arr[:-1] * 0.25 + arr[1:] * 0.75
+        arr = refined
 
     return arr.tolist()
+
+
+def chaikins_corner_cutting_in_bulk(
+    coords: np.ndarray,
+    offsets: np.ndarray,
+    refinements=5,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Same as `chaikins_corner_cutting` for many lines at once,
+    the coordinates of line i being `coords[offsets[i]:offsets[i+1]]`.
+    Returns the refined coordinates and their offsets likewise.
+    """
+
+    arr = np.asarray(coords, dtype=np.float64)
+    offsets = np.asarray(offsets)
+
+    for _ in range(refinements):
+        # Every line doubles in size,
+        # so coordinate k's edge lands at 2k+1 and 2k+2.
+        refined = np.empty((2 * len(arr), arr.shape[1]))
+        refined_offsets = 2 * offsets
+        refined[refined_offsets[:-1]] = arr[offsets[:-1]]
+        refined[refined_offsets[1:] - 1] = arr[offsets[1:] - 1]
+
+        is_edge_start = np.ones(len(arr), dtype=bool)
+        is_edge_start[offsets[1:] - 1] = False
+        edge_starts = np.flatnonzero(is_edge_start)
+        starts = arr[edge_starts]
+        ends = arr[edge_starts + 1]
+        refined[2 * edge_starts + 1] = starts * 0.75 + ends * 0.25
+        refined[2 * edge_starts + 2] = starts * 0.25 + ends * 0.75
+
+        arr = refined
+        offsets = refined_offsets
+
+    return arr, offsets
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from itertools import count, takewhile
 import multiprocessing as mp
 import os
-from typing import Any, Callable, List, Tuple
+from typing import Any, Callable, Iterator
 from tqdm import tqdm
 
 from .clean_exit import CleanExit, kill_children, set_clean_exit
@@ -18,7 +18,7 @@ class TilerParameters:
     num_processes: int = 1
 
 
-@dataclass
+@dataclass(frozen=True)
 class TileParameters:
     start_x: int
     start_y: int
@@ -26,6 +26,21 @@ class TileParameters:
     height: int
 
 
+# The tile processing function is handed to each worker once,
+# when the worker starts, rather than pickled along with every tile.
+_process_tile: Callable[[TileParameters], Any] | None = None
+
+
+def _init_worker(
+    process_tile: Callable[[TileParameters], Any],
+    init_worker: Callable[[], None] | None,
+) -> None:
+    global _process_tile
+    _process_tile = process_tile
+    if init_worker is not None:
+        init_worker()
+
+
 class Tiler:
     def __init__(
         self,
@@ -35,48 +50,61 @@ class Tiler:
             [TileParameters],
             Any
         ],
+        init_worker: Callable[[], None] | None = None,
     ) -> None:
         self.tiler_parameters = tiler_parameters
         self.step = step
         self.process_tile = process_tile
+        # Set up per-process state, such as open files,
+        # once in each worker before it processes any tiles.
+        self.init_worker = init_worker
+
+    def _generate_tiles(self) -> Iterator[TileParameters]:
+        tp = self.tiler_parameters
+        for x in range(tp.startx, tp.endx, tp.tile_size):
+            for y in range(tp.starty, tp.endy, tp.tile_size):
+                yield TileParameters(x, y, tp.tile_size, tp.tile_size)
 
-    def _generate_tiles(self) -> List[TileParameters]:
+    def _get_num_tiles(self) -> int:
         tp = self.tiler_parameters
-        all_tile_parameters = [
-            TileParameters(x, y, tp.tile_size, tp.tile_size)
-            for x in range(tp.startx, tp.endx, tp.tile_size)
-            for y in range(tp.starty, tp.endy, tp.tile_size)
-        ]
-        return all_tile_parameters
+        num_x = len(range(tp.startx, tp.endx, tp.tile_size))
+        num_y = len(range(tp.starty, tp.endy, tp.tile_size))
+        return num_x * num_y
 
     @staticmethod
-    def _process_tile_wrapper(args: Tuple[
-        TileParameters,
-        Callable[[TileParameters], None],
-    ]) -> None:
+    def _process_tile_wrapper(tile_parameters: TileParameters) -> None:
         try:
-            tile_parameters, process_tile = args
-            process_tile(tile_parameters)
+            assert _process_tile is not None
+            _process_tile(tile_parameters)
         except CleanExit:
             print(f"[{os.getpid()}] clean exit")
             pass
 
     def _process_tiles(
         self,
-        all_tile_parameters: List[TileParameters],
+        all_tile_parameters: Iterator[TileParameters],
+        num_tiles: int,
     ) -> None:
         tp = self.tiler_parameters
-        all_args = [(
-            tile_parameters,
-            self.process_tile,
-        ) for tile_parameters in all_tile_parameters]
+        chunksize = max(1, num_tiles // (4 * tp.num_processes))
 
-        pool = mp.Pool(processes=tp.num_processes)
+        pool = mp.Pool(
+            processes=tp.num_processes,
+            initializer=_init_worker,
+            initargs=(self.process_tile, self.init_worker),
+        )
         try:
             for _ in tqdm(
-                pool.imap_unordered(self._process_tile_wrapper, all_args),
-                total=len(all_args),
-                desc=f"[{self.step}] Processing tiles"
+                pool.imap_unordered(
+                    self._process_tile_wrapper,
+                    all_tile_parameters,
+                    chunksize=chunksize,
+                ),
+                total=num_tiles,
+                desc=f"[{self.step}] Processing tiles",
+                # Small tiles finish quickly and in great numbers,
+                # so the bar is redrawn less often.
+                mininterval=0.5,
             ):
                 pass
             pool.close()
@@ -89,4 +117,5 @@ class Tiler:
         set_clean_exit()
 
         all_tile_parameters = self._generate_tiles()
-        self._process_tiles(all_tile_parameters)
+        num_tiles = self._get_num_tiles()
+        self._process_tiles(all_tile_parameters, num_tiles)
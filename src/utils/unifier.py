@@ -1,19 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from geopandas import GeoDataFrame, GeoSeries
+import shapely
 from shapely import Geometry
-from shapely.ops import unary_union
 
 
 def unify(gs: GeoSeries) -> Geometry:
-    geometries = gs.tolist()
-    union = unary_union(geometries)
+    union = shapely.unary_union(gs.values)
     return union
 
 
 def unify_by_label(
     gdf: GeoDataFrame,
     label_name: str,
+    workers: int = 1,
 ) -> GeoDataFrame:
-    union_gdf = gdf.groupby(label_name).agg({"geometry": unify})
-    union_gdf = union_gdf.reset_index()
-    union_gdf = union_gdf.set_geometry("geometry")
+    groups = list(gdf.groupby(label_name).geometry)
+    labels = [label for label, _gs in groups]
+
+    geometries = [gs for _label, gs in groups]
+    if workers <= 1 or len(geometries) <= 1:
+        unions = [unify(gs) for gs in geometries]
+    else:
+        # GEOS releases the GIL during unions,
+        # so the groups can be unified in parallel with threads.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            unions = list(executor.map(unify, geometries))
+
+    union_gdf = GeoDataFrame(
+        {label_name: labels},
+        geometry=unions,
+        crs=gdf.crs,
+    )
     return union_gdf
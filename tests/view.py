@@ -1,7 +1,9 @@
 import click
 
 import geopandas as gpd
+from pyogrio import read_dataframe
 import rasterio
+import shapely
 
 from visualization import get_show_config, show_polygons, show_raster
 
@@ -22,25 +24,35 @@ from visualization import get_show_config, show_polygons, show_raster
     default="label",
     help='Name of the attribute storing the original pixel values',
 )
-def cli(tiffile, gpkgfile, label_name):
+@click.option(
+    '--bbox',
+    type=(float, float, float, float),
+    default=None,
+    help='Only view polygons intersecting MINX MINY MAXX MAXY',
+)
+def cli(tiffile, gpkgfile, label_name, bbox):
     if tiffile is not None:
         with rasterio.open(tiffile) as src:
             data = src.read(1)
             cmap, min_value, max_value = get_show_config(data)
             show_raster(data, cmap, min_value, max_value)
     elif gpkgfile is not None:
-        gdf = gpd.read_file(gpkgfile)
-
-        polygons = []
-        labels = []
-        for shape, label in zip(gdf.geometry, gdf[label_name]):
-            if shape.geom_type == "MultiPolygon":
-                shapes = shape.geoms
-                polygons.extend(shapes)
-                labels.extend([label] * len(shapes))
-            else:
-                polygons.append(shape)
-                labels.append(label)
+        # Only the label and the features in view are read in.
+        if gpkgfile.endswith(".parquet"):
+            gdf = gpd.read_parquet(gpkgfile, columns=[label_name, "geometry"])
+            if bbox is not None:
+                minx, miny, maxx, maxy = bbox
+                gdf = gdf.cx[minx:maxx, miny:maxy]
+        else:
+            gdf = read_dataframe(gpkgfile, columns=[label_name], bbox=bbox)
+
+        # Flatten MultiPolygons into their parts, each keeping its label.
+        parts, part_idxes = shapely.get_parts(
+            gdf.geometry.values,
+            return_index=True,
+        )
+        polygons = list(parts)
+        labels = gdf[label_name].to_numpy()[part_idxes].tolist()
 
         show_polygons(polygons, labels)
 
@@ -1,40 +1,41 @@
-import random
 import numpy as np
+import pandas as pd
 
-from matplotlib.collections import PatchCollection
-from matplotlib.patches import Polygon as PolygonPatch
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
 
-def generate_random_color():
-    r = random.randint(0, 255)
-    g = random.randint(0, 255)
-    b = random.randint(0, 255)
-    return (r / 255, g / 255, b / 255)
-
-
-def generate_n_random_colors(n):
-    return [generate_random_color() for _ in range(n)]
+# Returns a render color per label along with the label -> color map.
+def generate_colors(labels):
+    codes, uniq_labels = pd.factorize(np.asarray(labels))
+    render_colors = np.random.default_rng().random((uniq_labels.size, 3))
+    color_to_render_color = dict(zip(uniq_labels.tolist(), render_colors))
+    return render_colors[codes], color_to_render_color
 
 
 def generate_color_map(labels):
-    uniq_labels = set(labels)
-    n = len(uniq_labels)
-    render_colors = generate_n_random_colors(n)
-    color_to_render_color = {
-        c: render_colors[i] for i, c in enumerate(uniq_labels)
-    }
+    _colors, color_to_render_color = generate_colors(labels)
     return color_to_render_color
 
 
+def get_colors(labels, color_map=None):
+    if color_map is None:
+        colors, _color_map = generate_colors(labels)
+        return colors
+    return [color_map[label] for label in labels]
+
+
 def get_show_config(data):
-    num_unique_values = len(np.unique(data))
-    random_colors = np.random.rand(num_unique_values, 3)
+    # np.unique sorts, so its ends are the min and max of the data.
+    unique_values = np.unique(data)
+    num_unique_values = unique_values.size
+    random_colors = np.random.default_rng().random((num_unique_values, 3))
     custom_cmap = mcolors.ListedColormap(random_colors)
 
-    min_value = np.min(data)
-    max_value = np.max(data)
+    min_value = unique_values[0]
+    max_value = unique_values[-1]
 
     return custom_cmap, min_value, max_value
 
@@ -53,11 +54,13 @@ def show_polygons(polygons, labels=None, color_map=None):
 
     if labels is None:
         labels = list(range(len(polygons)))
-    if color_map is None:
-        color_map = generate_color_map(labels)
+    colors = get_colors(labels, color_map)
 
+    # Draw every polygon, holes included, as one compound path
+    # in a single collection rather than one collection per polygon.
+    paths = []
+    path_colors = []
     for i, polygon in enumerate(polygons):
-        color = color_map[labels[i]]
         ps = []
         if polygon.geom_type == "Polygon":
             ps.append(polygon)
@@ -65,15 +68,19 @@ def show_polygons(polygons, labels=None, color_map=None):
             for p in list(polygon.geoms):
                 ps.append(p)
 
-        patches = []
         for p in ps:
-            x, y = p.exterior.xy
-            patch = PolygonPatch(list(zip(x, y)), closed=True)
-            patches.append(patch)
-        collection = PatchCollection(patches, alpha=0.3)
-        collection.set_color(color)
-        collection.set_edgecolor("black")
-        ax.add_collection(collection)
+            rings = [p.exterior] + list(p.interiors)
+            path = Path.make_compound_path(*[
+                Path(np.asarray(ring.coords), closed=True) for ring in rings
+            ])
+            paths.append(path)
+            path_colors.append(colors[i])
+
+    collection = PathCollection(paths, alpha=0.3)
+    collection.set_facecolor(path_colors)
+    collection.set_edgecolor("black")
+    ax.add_collection(collection)
+    ax.autoscale_view()
 
     plt.axis('equal')
 
@@ -89,12 +96,11 @@ def show_lines(lines, labels=None, color_map=None):
 
     if labels is None:
         labels = list(range(len(lines)))
-    if color_map is None:
-        color_map = generate_color_map(labels)
+    colors = get_colors(labels, color_map)
 
     for i, l in enumerate(lines):
         x, y = l.xy
-        ax.plot(x, y, color=color_map[labels[i]])
+        ax.plot(x, y, color=colors[i])
 
     plt.axis('equal')
 